@@ -0,0 +1,127 @@
+"""Time per-document term collection against the compiled autolink index.
+
+    python bench/autolink_index.py [--terms 5000] [--docs 50]
+
+Both paths link the terms of the first ``--docs`` pages of a synthetic
+corpus (see bench/corpus.py): ``per_document`` rebuilds the delimiter regex
+and the term maps for each page, as AutoLinkPostTransform used to, while
+``compiled_once`` builds the index once and shares it.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from docutils import nodes
+from docutils.frontend import get_default_settings
+from docutils.parsers.rst import Parser
+from docutils.utils import new_document
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import corpus
+from src.helper.autolink import (
+    _collect_terms,
+    _entry_classes,
+    build_delimiter_regex,
+    compile_index,
+    get_delimiters,
+    link_terms,
+)
+
+class PerCallIndex:
+    """The lookups of the old per-document path, behind the interface of
+    AutoLinkIndex so both paths share ``link_terms``."""
+
+    def __init__(self, config):
+        self.pattern = build_delimiter_regex(get_delimiters(config))
+        self.sources, self.global_terms, self.source_classes = _collect_terms(config)
+
+    def resolve(self, prefix, term):
+        terms = self.global_terms if prefix is None else self.sources.get(prefix) or {}
+        found = terms.get(term.lower())
+        if found is None:
+            return None
+        entry_key, entry = found
+        classes = ['autolink'] + self.source_classes.get(prefix or 'global', []) + _entry_classes(entry)
+        return entry_key, entry, classes, None
+
+def autolink_config(summary):
+    return {
+        source: {'class': f'autolink-glossary-{source}', 'files': [summary['yml'][source]]}
+        for source in summary['sources']
+    }
+
+def page_paragraphs(srcdir):
+    """The prose paragraphs of every page: frontmatter, fences and directives
+    are skipped, as autolink never sees them as text."""
+    pages = []
+    for dirpath, _, filenames in sorted(os.walk(srcdir)):
+        for name in sorted(filenames):
+            if not name.endswith('.md'):
+                continue
+            with open(os.path.join(dirpath, name), encoding='utf-8') as f:
+                blocks = f.read().split('\n\n')
+            pages.append([b for b in blocks if b.strip() and not b.startswith(('---', '```', '#'))])
+    return pages
+
+def make_documents(pages):
+    settings = get_default_settings(Parser)
+    documents = []
+    for paragraphs in pages:
+        document = new_document('<bench>', settings)
+        for text in paragraphs:
+            document += nodes.paragraph(text, text)
+        documents.append(document)
+    return documents
+
+def count_links(documents):
+    return sum(len(list(d.findall(nodes.reference))) for d in documents)
+
+def per_document(config, documents):
+    start = time.perf_counter()
+    for document in documents:
+        link_terms(document, PerCallIndex(config))
+    return time.perf_counter() - start
+
+def once(config, documents):
+    start = time.perf_counter()
+    index = compile_index(config)
+    for document in documents:
+        link_terms(document, index)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    corpus.add_arguments(parser)
+    parser.add_argument('--docs', type=int, default=50, help='pages to link')
+    parser.set_defaults(terms=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        summary = corpus.generate(tmp, **corpus.corpus_options(args))
+        config = autolink_config(summary)
+        pages = page_paragraphs(summary['srcdir'])[:args.docs]
+        before_docs = make_documents(pages)
+        after_docs = make_documents(pages)
+        before = per_document(config, before_docs)
+        after = once(config, after_docs)
+        links = count_links(after_docs)
+        if links != count_links(before_docs):
+            raise SystemExit('both paths must make the same links')
+
+    print(json.dumps({
+        "terms": summary['terms'],
+        "docs": len(pages),
+        "links": links,
+        "per_document_s": round(before, 4),
+        "compiled_once_s": round(after, 4),
+        "saved_s": round(before - after, 4),
+        "per_document_ms_per_doc": round(before / len(pages) * 1000, 2),
+        "compiled_once_ms_per_doc": round(after / len(pages) * 1000, 2),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
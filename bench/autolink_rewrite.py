@@ -0,0 +1,103 @@
+"""Compare the legacy per-text-node autolink rewrite with the single-pass one.
+
+    python bench/autolink_rewrite.py [--paragraphs 50] [--links 400]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from docutils import nodes
+from docutils.frontend import get_default_settings
+from docutils.parsers.rst import Parser
+from docutils.utils import new_document
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.helper.autolink import compile_index, link_terms, link_text
+
+def make_config(n_terms):
+    entries = {
+        f"logic/entry-{i}": {"terms": [f"termo {i}"], "url": f"/glossary/logic#entry-{i}"}
+        for i in range(n_terms)
+    }
+    return {"logic": {"class": "autolink-glossary-logic", "entries": entries}}
+
+def make_document(n_paragraphs, n_links, n_terms, depth=8):
+    """Long glossary-like paragraphs: many text runs separated by emphasis,
+    each carrying a term, nested inside ``depth`` levels of lists."""
+    document = new_document("<bench>", get_default_settings(Parser))
+    container = document
+    for _ in range(depth):
+        bullets = nodes.bullet_list()
+        item = nodes.list_item()
+        bullets += item
+        container += bullets
+        container = item
+    for p in range(n_paragraphs):
+        para = nodes.paragraph()
+        for i in range(n_links):
+            term = (p * n_links + i) % n_terms
+            para += nodes.Text(f"texto {{logic:termo {term}}} e mais ")
+            para += nodes.emphasis(text="ênfase")
+        ref = nodes.reference(refuri="#x")
+        ref += nodes.Text("{logic:termo 0}")
+        para += ref
+        container += para
+    return document
+
+def _is_inside_reference(node):
+    parent = getattr(node, 'parent', None)
+    while parent is not None:
+        if isinstance(parent, nodes.reference):
+            return True
+        parent = getattr(parent, 'parent', None)
+    return False
+
+def legacy_link_terms(document, index):
+    for text_node in list(document.findall(nodes.Text)):
+        parent = text_node.parent
+        if parent is None or _is_inside_reference(text_node):
+            continue
+        new_nodes = link_text(text_node.astext(), index)
+        if new_nodes is None:
+            continue
+        idx = parent.index(text_node)
+        parent.children[idx:idx+1] = new_nodes
+        for node in new_nodes:
+            node.parent = parent
+
+def timed(func, document, index, repeat):
+    best = None
+    for _ in range(repeat):
+        doc = document.deepcopy()
+        start = time.perf_counter()
+        func(doc, index)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, doc
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paragraphs", type=int, default=50)
+    parser.add_argument("--links", type=int, default=400)
+    parser.add_argument("--terms", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    index = compile_index(make_config(args.terms))
+    document = make_document(args.paragraphs, args.links, args.terms)
+
+    legacy, legacy_doc = timed(legacy_link_terms, document, index, args.repeat)
+    single, single_doc = timed(link_terms, document, index, args.repeat)
+    print(json.dumps({
+        "paragraphs": args.paragraphs,
+        "links_per_paragraph": args.links,
+        "legacy_s": round(legacy, 4),
+        "single_pass_s": round(single, 4),
+        "identical": legacy_doc.pformat() == single_doc.pformat(),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
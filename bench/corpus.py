@@ -0,0 +1,163 @@
+"""Generate a synthetic site that exercises every extension of src/helper.
+
+    python bench/corpus.py OUTDIR [--pages 500] [--terms 2000] [--depth 3]
+
+The corpus has the same shape as ``content``: ``libs``, ``notes`` and
+``glossary`` sections with nested directories, frontmatter (title, weight,
+version and a few drafts), ``{src:term}`` references into glossary YAML
+files, plain-text tables and ``toc``/``toc-hor``/``toc-dir`` directives.
+Generation is deterministic for a given seed.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+SECTIONS = ['libs', 'notes', 'glossary']
+SOURCES = ['general', 'logic', 'infra', 'dev']
+WORDS = (
+    'type model universe factory value object morphism category space map '
+    'domain codomain function module component render layout build cache '
+    'index entry section page graph node edge proof theorem lemma set'
+).split()
+
+def _sentence(rng, n=12):
+    words = [rng.choice(WORDS) for _ in range(n)]
+    return ' '.join(words).capitalize() + '.'
+
+def _term(i):
+    return f"term {i}"
+
+def write_glossary(root, n_terms):
+    """Write one YAML file per source and return ``{source: path}``."""
+    yml_dir = os.path.join(root, 'yml')
+    os.makedirs(yml_dir, exist_ok=True)
+    files = {}
+    for s, source in enumerate(SOURCES):
+        path = os.path.join(yml_dir, f'{source}.yml')
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(s, n_terms, len(SOURCES)):
+                f.write(f'{source}/entry-{i}:\n')
+                f.write(f'  terms: ["{_term(i)}", "{_term(i)}s"]\n')
+                f.write(f'  url: /glossary/{source}#entry-{i}\n\n')
+        files[source] = path
+    return files
+
+def _table(rng, number):
+    rows = [f"{'name':<12}{'kind':<12}description", '-' * 40]
+    for r in range(rng.randint(3, 8)):
+        rows.append(f"{rng.choice(WORDS) + str(r):<12}{rng.choice(WORDS):<12}{_sentence(rng, 4)}")
+    rows += ['-' * 40, f'table {number}']
+    return '```\n' + '\n'.join(rows) + '\n```\n'
+
+def _paragraph(rng, n_terms, refs):
+    parts = []
+    for _ in range(rng.randint(3, 6)):
+        parts.append(_sentence(rng))
+        for _ in range(refs):
+            i = rng.randrange(n_terms)
+            parts.append(f'See {{{SOURCES[i % len(SOURCES)]}:{_term(i)}}}.')
+    return ' '.join(parts)
+
+def _page(rng, title, weight, n_terms, refs, tables, draft=False, version=None):
+    lines = ['---', f'title: {title}', f'weight: {weight}']
+    if version:
+        lines.append(f'version: {version}')
+    if draft:
+        lines.append('draft: true')
+    lines += ['---', '', f'# {title}', '', _paragraph(rng, n_terms, refs), '',
+              '```{toc}', '```', '']
+    for h in range(rng.randint(2, 5)):
+        lines += [f'## {rng.choice(WORDS)} {h}', '', _paragraph(rng, n_terms, refs), '']
+        if h < tables:
+            lines += [_table(rng, h + 1), '']
+        for sub in range(rng.randint(0, 2)):
+            lines += [f'### {rng.choice(WORDS)} {h}.{sub}', '', _paragraph(rng, n_terms, refs), '']
+    return '\n'.join(lines)
+
+def _index(title, weight, recursive):
+    lines = ['---', f'title: {title}', f'weight: {weight}', '---', '', f'# {title}', '',
+             '```{toc-hor}', '```', '', '## contents', '', '```{toc-dir}']
+    if recursive:
+        lines.append(':recursive:')
+    lines += ['```', '']
+    return '\n'.join(lines)
+
+def _directories(depth, fanout):
+    """Yield relative directory paths of a ``fanout``-ary tree per section."""
+    for section in SECTIONS:
+        level = [section]
+        for _ in range(depth):
+            yield from level
+            level = [f'{d}/d{k}' for d in level for k in range(fanout)]
+
+def generate(root, pages=500, terms=2000, depth=3, fanout=2, refs=2, tables=1,
+             draft_ratio=0.05, seed=0):
+    """Write the corpus under ``root/content`` and return a summary dict."""
+    rng = random.Random(seed)
+    srcdir = os.path.join(root, 'content')
+    dirs = list(_directories(depth, fanout))
+    for d in dirs:
+        os.makedirs(os.path.join(srcdir, d), exist_ok=True)
+        with open(os.path.join(srcdir, d, 'index.md'), 'w', encoding='utf-8') as f:
+            f.write(_index(os.path.basename(d), 0, recursive=d in SECTIONS))
+
+    with open(os.path.join(srcdir, 'index.md'), 'w', encoding='utf-8') as f:
+        f.write(_index('home', 0, recursive=False))
+        f.write('\n' + '\n'.join(f'- [{s}](./{s}/index)' for s in SECTIONS) + '\n')
+
+    drafts = 0
+    for n in range(pages):
+        d = dirs[n % len(dirs)]
+        draft = rng.random() < draft_ratio
+        drafts += draft
+        version = f'0.{n % 10}.{n % 7}' if n % 5 == 0 else None
+        text = _page(rng, f'page {n}', n % 50, terms, refs, tables, draft, version)
+        with open(os.path.join(srcdir, d, f'page-{n}.md'), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    return {
+        'srcdir': srcdir,
+        'yml': write_glossary(root, terms),
+        'sections': SECTIONS,
+        'sources': SOURCES,
+        'pages': pages + len(dirs) + 1,
+        'drafts': drafts,
+        'directories': len(dirs),
+        'terms': terms,
+    }
+
+def add_arguments(parser):
+    parser.add_argument('--pages', type=int, default=500)
+    parser.add_argument('--terms', type=int, default=2000)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fanout', type=int, default=2)
+    parser.add_argument('--refs', type=int, default=2,
+                        help='term references per sentence group')
+    parser.add_argument('--tables', type=int, default=1,
+                        help='txt tables per page section (first sections only)')
+    parser.add_argument('--seed', type=int, default=0)
+
+def corpus_options(args):
+    return {
+        'pages': args.pages,
+        'terms': args.terms,
+        'depth': args.depth,
+        'fanout': args.fanout,
+        'refs': args.refs,
+        'tables': args.tables,
+        'seed': args.seed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('outdir')
+    add_arguments(parser)
+    args = parser.parse_args()
+    summary = generate(os.path.abspath(args.outdir), **corpus_options(args))
+    print(json.dumps(summary, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Time each site extension in isolation and the full build on a synthetic
+corpus (see bench/corpus.py).
+
+    python bench/extensions.py [--pages 500] [--terms 2000] [--repeat 3]
+
+Every extension of ``src/conf.py`` is built as ``myst_parser`` plus that
+extension alone and reported against a ``myst_parser``-only baseline; ``full``
+is the ``make html`` configuration (all of them, the site templates and static
+files). All builds share the literal settings of ``src/conf.py``.
+Builds are fresh (``-E``) and use an empty cache directory, so the numbers
+are cold-build costs. Results are printed as JSON.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import corpus
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC = os.path.join(ROOT, 'src')
+# Settings the bench writes itself, for the synthetic corpus and the
+# temporary configuration directory.
+OVERRIDDEN = {
+    'extensions', 'templates_path', 'html_static_path', 'html_context',
+    'autolink', 'menu_sections', 'exclude_patterns',
+}
+
+CONF_TEMPLATE = '''\
+import sys
+sys.path.insert(0, {helper!r})
+
+extensions = {extensions!r}
+{settings}
+{extra}
+'''
+
+def site_settings(path=os.path.join(SRC, 'conf.py')):
+    """The top-level literal assignments of the site's conf.py. It is parsed
+    rather than imported, as it needs the site's own import path."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    settings = {}
+    for node in tree.body:
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)):
+            continue
+        try:
+            settings[node.targets[0].id] = ast.literal_eval(node.value)
+        except ValueError:
+            continue
+    return settings
+
+SITE_SETTINGS = site_settings()
+EXTENSIONS = [name for name in SITE_SETTINGS['extensions'] if name != 'myst_parser']
+
+def _autolink_conf(summary):
+    config = {
+        source: {'class': f'autolink-glossary-{source}', 'files': [summary['yml'][source]]}
+        for source in summary['sources']
+    }
+    return f'autolink = {config!r}'
+
+def _menu_conf(summary):
+    menu = {'home': {'path': '/'}}
+    menu.update({s: {'path': f'/{s}', 'class': ''} for s in summary['sections']})
+    return (
+        f"html_context = {{'title': 'bench', 'year': 2000, 'menu': {menu!r}}}\n"
+        f"menu_sections = {summary['sections']!r}\n"
+        # menu.py renders the sidebar through the site's menu.html.
+        f"templates_path = [{os.path.join(SRC, 'templates')!r}]"
+    )
+
+def write_conf(confdir, summary, names, full=False):
+    extra = []
+    if 'autolink' in names:
+        extra.append(_autolink_conf(summary))
+    if 'menu' in names or full:
+        extra.append(_menu_conf(summary))
+    if full:
+        extra.append(f"html_static_path = [{os.path.join(SRC, 'static')!r}]")
+    settings = {k: v for k, v in SITE_SETTINGS.items() if k not in OVERRIDDEN}
+    os.makedirs(confdir, exist_ok=True)
+    with open(os.path.join(confdir, 'conf.py'), 'w', encoding='utf-8') as f:
+        f.write(CONF_TEMPLATE.format(
+            helper=os.path.join(SRC, 'helper'),
+            extensions=['myst_parser'] + names,
+            settings='\n'.join(f'{k} = {v!r}' for k, v in settings.items()),
+            extra='\n'.join(extra),
+        ))
+
+def build(srcdir, confdir, builddir, cachedir):
+    cmd = [
+        sys.executable, '-m', 'sphinx', '-M', 'html', srcdir, builddir,
+        '-c', confdir, '-q', '-E',
+    ]
+    env = dict(os.environ, SITE_CACHE_DIR=cachedir)
+    start = time.perf_counter()
+    subprocess.run(cmd, check=True, cwd=ROOT, env=env, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def measure(tmp, summary, name, names, repeat, full=False):
+    confdir = os.path.join(tmp, 'conf', name)
+    write_conf(confdir, summary, names, full)
+    times = []
+    for r in range(repeat):
+        run = os.path.join(tmp, 'runs', f'{name}-{r}')
+        times.append(build(summary['srcdir'], confdir, os.path.join(run, 'dist'),
+                           os.path.join(run, 'cache')))
+    return {'best': round(min(times), 3), 'runs': [round(t, 3) for t in times]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    corpus.add_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--extensions', nargs='+', default=EXTENSIONS, choices=EXTENSIONS)
+    parser.add_argument('--no-full', action='store_true', help='skip the full build')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        summary = corpus.generate(tmp, **corpus.corpus_options(args))
+        baseline = measure(tmp, summary, 'baseline', [], args.repeat)
+        results = {'baseline': baseline}
+        for name in args.extensions:
+            result = measure(tmp, summary, name, [name], args.repeat)
+            result['overhead'] = round(result['best'] - baseline['best'], 3)
+            results[name] = result
+        if not args.no_full:
+            result = measure(tmp, summary, 'full', EXTENSIONS, args.repeat, full=True)
+            result['overhead'] = round(result['best'] - baseline['best'], 3)
+            results['full'] = result
+
+    corpus_info = {k: v for k, v in summary.items() if k not in ('srcdir', 'yml')}
+    print(json.dumps({'corpus': corpus_info, 'seconds': results}, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Time the python+jinja lexer against the previous chunk-by-chunk version on
+the python blocks of the docs.
+
+    python bench/jinja_lexer.py [--copies 20] [--repeat 5]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+from pygments.lexer import RegexLexer, bygroups, using
+from pygments.lexers.python import PythonLexer
+from pygments.lexers.templates import HtmlDjangoLexer
+from pygments.token import String, Whitespace
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'helper'))
+
+from app import PythonWithJinjaLexer
+
+BLOCK_REGEX = re.compile(r'```python\n(.*?)```', re.DOTALL)
+
+class LegacyLexer(RegexLexer):
+    """The lexer as it was before, with its missing import restored."""
+    tokens = {
+        'root': [
+            (r'([urURfFbB]*)([\'\"]{3})jinja(\r?\n)',
+             bygroups(String.Affix, String.Double, Whitespace), 'jinja-block'),
+            (r'([urURfFbB]*)([\'\"]{3})', bygroups(String.Affix, String.Double), 'python-string'),
+            (r'[^\n\'"]+', using(PythonLexer)),
+            (r'[\n\'"]', using(PythonLexer)),
+        ],
+        'jinja-block': [
+            (r'([\'\"]{3})', String.Double, '#pop'),
+            (r'[^\'"]+', using(HtmlDjangoLexer)),
+            (r'[\n\'"]', using(HtmlDjangoLexer)),
+        ],
+        'python-string': [
+            (r'([\'\"]{3})', String.Double, '#pop'),
+            (r'.|\n', String.Double),
+        ],
+    }
+
+def load_blocks(pattern):
+    blocks = []
+    for filename in sorted(glob.glob(pattern, recursive=True)):
+        with open(filename, encoding='utf-8') as f:
+            blocks.extend(BLOCK_REGEX.findall(f.read()))
+    return blocks
+
+def best_time(lexer, blocks, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for block in blocks:
+            for _ in lexer.get_tokens(block):
+                pass
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def lossless(lexer, blocks):
+    """Whether the tokens of every block add up to the block itself."""
+    return all(
+        ''.join(value for _, value in lexer.get_tokens(block)) == block.rstrip('\n') + '\n'
+        for block in blocks
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', default=os.path.join(ROOT, 'content', 'libs', 'comp', '**', '*.md'))
+    parser.add_argument('--copies', type=int, default=20, help='times each block is lexed per run')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    blocks = load_blocks(args.docs)
+    jinja_blocks = sum('jinja\n' in block for block in blocks)
+    workload = blocks * args.copies
+    legacy = LegacyLexer(stripnl=False)
+    current = PythonWithJinjaLexer()
+    legacy_time = best_time(legacy, workload, args.repeat)
+    current_time = best_time(current, workload, args.repeat)
+    print(json.dumps({
+        'blocks': len(blocks),
+        'jinja_blocks': jinja_blocks,
+        'chars': sum(len(block) for block in workload),
+        'legacy_seconds': round(legacy_time, 4),
+        'current_seconds': round(current_time, 4),
+        'speedup': round(legacy_time / current_time, 2),
+        'legacy_lossless': lossless(legacy, blocks),
+        'current_lossless': lossless(current, blocks),
+    }, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Build the site with 1/2/4/8 workers, time each build and check that the
+generated pages are identical to the serial build.
+
+    python bench/parallel.py [--jobs 1 2 4 8] [--srcdir content]
+"""
+import argparse
+import filecmp
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Files that legitimately differ between builds.
+IGNORED = {'.buildinfo', 'buildstamp.js', 'objects.inv'}
+
+def build(srcdir, outdir, jobs):
+    cmd = [
+        sys.executable, '-m', 'sphinx', '-q', '-E', '-b', 'html',
+        '-c', os.path.join(ROOT, 'src'),
+        '-d', os.path.join(outdir, '.doctrees'),
+        '-j', str(jobs),
+        srcdir, outdir,
+    ]
+    start = time.perf_counter()
+    subprocess.run(cmd, check=True, cwd=ROOT, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def differing_files(left, right):
+    diffs = []
+    for dirpath, dirnames, filenames in os.walk(left):
+        dirnames[:] = [d for d in dirnames if d != '.doctrees']
+        rel = os.path.relpath(dirpath, left)
+        for name in filenames:
+            if name in IGNORED:
+                continue
+            a = os.path.join(dirpath, name)
+            b = os.path.join(right, rel, name)
+            if not os.path.exists(b) or not filecmp.cmp(a, b, shallow=False):
+                diffs.append(os.path.normpath(os.path.join(rel, name)))
+    return diffs
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--srcdir', default=os.path.join(ROOT, 'content'))
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        serial = None
+        for jobs in args.jobs:
+            outdir = os.path.join(tmp, f'j{jobs}')
+            elapsed = build(os.path.abspath(args.srcdir), outdir, jobs)
+            if serial is None:
+                serial = outdir
+                diffs = []
+            else:
+                diffs = differing_files(serial, outdir) + differing_files(outdir, serial)
+            results.append({
+                'jobs': jobs,
+                'seconds': round(elapsed, 3),
+                'identical_to_serial': not diffs,
+                'differences': sorted(set(diffs)),
+            })
+    print(json.dumps(results, indent=2))
+    return 0 if all(r['identical_to_serial'] for r in results) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
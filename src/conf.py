@@ -1,7 +1,6 @@
 import sys
-from utils import yml, path
-from src.helper.menu import _get_menu_items
-from src.helper.date import _year, _now
+from utils import path
+from src.helper.date import _year
 path.insert('./helper')
 
 extensions = [
@@ -10,7 +9,16 @@ extensions = [
     'tables',
     'autolink',
     'draft',
-    'version'
+    'version',
+    'menu',
+    'date',
+    'postbuild',
+    'search',
+    'app',
+    'highlight',
+    'mathrender',
+    'assets',
+    'profiling'
 ]
 
 source_suffix = ['.md']
@@ -27,7 +35,7 @@ suppress_warnings = [
 html_title = 'yx'
 html_static_path = ['static', '../assets']
 html_permalinks_icon = ""
-myst_number_code_blocks = ["python"]
+myst_number_code_blocks = ["python", "python+jinja"]
 highlight_language = None
 
 html_favicon = '/_static/favicon.svg'
@@ -45,7 +53,6 @@ CONTENT_DIR = path.join(ROOT_DIR, 'content')
 html_context={
     'title': 'Yuri Ximenes',
     'year': _year(),
-    'now': _now(),
     'menu': {
         'home': {"path": "/"},
         'about': {"path": '/about'},
@@ -57,44 +64,51 @@ html_context={
         'libs': {"path": '/libs', "class": ""},
         'notes': {"path": '/notes', "class": ""},
         'glossary': {"path": '/glossary', "class": ""}
-    },
-    'libs_menu': _get_menu_items(CONTENT_DIR, 'libs'),
-    'notes_menu': _get_menu_items(CONTENT_DIR, 'notes'),
-    'glossary_menu': _get_menu_items(CONTENT_DIR, 'glossary')
+    }
 }
 
+menu_sections = ['libs', 'notes', 'glossary']
+# Ship only the active branch of the sidebar and load the rest from a JSON
+# manifest (see menu.py and static/nav.js).
+menu_manifest = False
+
+# Math is typeset by KaTeX in the browser. Set to 'mathml' to render the
+# :tex ...: spans at build time instead (see mathrender.py); pages whose math
+# is then fully rendered do not load KaTeX.
+math_renderer = None
+
 autolink = {
     "global": {
         "class": "autolink-global",
-        "entries": yml.read(path.join(YML_DIR, "global.yml"))
+        "files": [path.join(YML_DIR, "global.yml")]
     },
     "lib": {
         "class": "autolink-libs",
-        "entries": yml.read(path.join(YML_DIR, "libs/libs.yml"))
+        "files": [path.join(YML_DIR, "libs/libs.yml")]
     },
     "notes": {
         "class": "autolink-notes",
-        "entries": yml.read(path.join(YML_DIR, "notes.yml"))
+        "files": [path.join(YML_DIR, "notes.yml")]
     },
     "general": {
         "class": "autolink-glossary-general",
-        "entries": yml.read(path.join(YML_DIR, "glossary/general.yml"))
+        "files": [path.join(YML_DIR, "glossary/general.yml")]
     },
     "logic": {
         "class": "autolink-glossary-logic",
-        "entries": yml.read(path.join(YML_DIR, "glossary/logic.yml"))
+        "files": [path.join(YML_DIR, "glossary/logic.yml")]
     },
     "infra": {
         "class": "autolink-glossary-infra",
-        "entries": yml.read(path.join(YML_DIR, "glossary/infra.yml"))
+        "files": [path.join(YML_DIR, "glossary/infra.yml")]
     },
     "dev": {
         "class": "autolink-glossary-dev",
-        "entries": yml.read(path.join(YML_DIR, "glossary/dev.yml"))
+        "files": [path.join(YML_DIR, "glossary/dev.yml")]
     },
     "py": {
         "class": "autolink-python",
-        "entries": yml.read(path.join(YML_DIR, "python.yml"))
+        "files": [path.join(YML_DIR, "python.yml")]
     },
 
 }
@@ -102,5 +116,4 @@ autolink = {
 libs = ["comp", "typed"]
 
 for lib in libs:
-    lib_yml = path.join(YML_DIR, f"libs/{lib}.yml")
-    autolink['lib']['entries'].update(yml.read(lib_yml))
+    autolink['lib']['files'].append(path.join(YML_DIR, f"libs/{lib}.yml"))
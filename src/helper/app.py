@@ -1,41 +1,77 @@
-from pygments.lexer import RegexLexer, bygroups, include, using, this, DelegatingLexer, Lexer
-from pygments.token import *
+import re
+from pygments.lexer import Lexer
+from pygments.token import Error, String, Whitespace
 from pygments.lexers.python import PythonLexer
-from pygments.lexers.templates import 
+from pygments.lexers.templates import HtmlDjangoLexer
 
-class PythonWithJinjaLexer(RegexLexer):
+JINJA_BLOCK_REGEX = re.compile(
+    r'([urURfFbB]*)([\'"]{3})(jinja)(\r?\n)(.*?)(\2|\Z)', re.DOTALL
+)
+# comp's jinja strings use bracket delimiters; each maps to the brace
+# delimiter of the same length, so token offsets stay valid.
+BRACKET_DELIMITERS = str.maketrans({'[': '{', ']': '}'})
+BRACKET_REGEX = re.compile(r'\[[%#\[]|[%#\]]\]')
+
+class PythonWithJinjaLexer(Lexer):
+    """Python with ``\"\"\"jinja`` strings highlighted as HTML+Jinja.
+
+    Every Python region between two jinja strings goes to a single
+    ``PythonLexer`` call and every jinja body to a single ``HtmlDjangoLexer``
+    call, so both keep their context across lines.
+    """
     name = 'PythonWithJinja'
     aliases = ['python+jinja', 'py+jinja', 'pythonwithjinja']
     filenames = ['*.py']
     mimetypes = ['text/x-python']
 
-    tokens = {
-        'root': [
-            # Start of a jinja block (with triple quotes + "jinja")
-            (r'([urURfFbB]*)([\'\"]{3})jinja(\r?\n)', 
-            bygroups(String.Affix, String.Double, Whitespace), 'jinja-block'),
-            # Any other triple quoted string
-            (r'([urURfFbB]*)([\'\"]{3})', bygroups(String.Affix, String.Double), 'python-string'),
-            # Delegate the rest to the PythonLexer (line-by-line!)
-            (r'[^\n\'"]+', using(PythonLexer)),
-            (r'[\n\'"]', using(PythonLexer)),
-        ],
-        'jinja-block': [
-            # End of the jinja triple quoted string
-            (r'([\'\"]{3})', String.Double, '#pop'),
-            # Jinja content: highlight with the html+django lexer (jinja2)
-            (r'[^\'"]+', using(HtmlDjangoLexer)),
-            (r'[\n\'"]', using(HtmlDjangoLexer)),
-        ],
-        'python-string': [
-            (r'([\'\"]{3})', String.Double, '#pop'),
-            (r'.|\n', String.Double),
-        ],
-    }
+    def __init__(self, **options):
+        # Keep leading blank lines like Sphinx's own python lexer does.
+        options.setdefault('stripnl', False)
+        super().__init__(**options)
+        self.python_lexer = PythonLexer(**options)
+        self.jinja_lexer = HtmlDjangoLexer(**options)
+
+    def _delegate(self, lexer, text, offset):
+        for index, token, value in lexer.get_tokens_unprocessed(text):
+            yield offset + index, token, value
 
+    def _jinja_tokens(self, body, offset):
+        # Pseudo-HTML such as ``<some html>`` is fine in a jinja string: what
+        # HtmlDjangoLexer rejects is shown as part of the string, as
+        # PythonLexer would, instead of failing the whole block.
+        translated = BRACKET_REGEX.sub(lambda m: m.group(0).translate(BRACKET_DELIMITERS), body)
+        for index, token, value in self.jinja_lexer.get_tokens_unprocessed(translated):
+            if token in Error:
+                token = String.Double
+            yield offset + index, token, body[index:index + len(value)]
+
+    def get_tokens_unprocessed(self, text):
+        last = 0
+        for match in JINJA_BLOCK_REGEX.finditer(text):
+            if match.start() > last:
+                yield from self._delegate(self.python_lexer, text[last:match.start()], last)
+            if match.group(1):
+                yield match.start(1), String.Affix, match.group(1)
+            yield match.start(2), String.Double, match.group(2) + match.group(3)
+            yield match.start(4), Whitespace, match.group(4)
+            yield from self._jinja_tokens(match.group(5), match.start(5))
+            if match.group(6):
+                yield match.start(6), String.Double, match.group(6)
+            last = match.end()
+        if last < len(text):
+            yield from self._delegate(self.python_lexer, text[last:], last)
+
+def register_lexer(app, config):
+    for alias in PythonWithJinjaLexer.aliases + list(config.jinja_lexer_aliases):
+        app.add_lexer(alias, PythonWithJinjaLexer)
 
 def setup(app):
-    from pygments.lexers import get_lexer_by_name
-    app.add_lexer('python+jinja', PythonWithJinjaLexer)
-    app.add_lexer('py+jinja', PythonWithJinjaLexer)
-    app.add_lexer('pythonwithjinja', PythonWithJinjaLexer)
+    # Extra languages to lex as python+jinja, e.g. ['python'] to take over
+    # every Python fence; by default only the lexer's own aliases are used.
+    app.add_config_value('jinja_lexer_aliases', [], 'env')
+    app.connect('config-inited', register_lexer)
+    return {
+        'version': '0.2',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,68 @@
+"""Record which pages need KaTeX, pygments.css and the table styles."""
+from docutils import nodes
+
+MATH_MARKER = ':tex'
+FLAGS = ('math', 'code', 'tables')
+
+def scan_assets(document):
+    """Return ``{'math': bool, 'code': bool, 'tables': bool}`` for ``document``.
+    Math inside code is ignored, as KaTeX's auto-render skips it too."""
+    found = dict.fromkeys(FLAGS, False)
+    stack = [document]
+    while stack and not all(found.values()):
+        node = stack.pop()
+        for child in node.children:
+            if isinstance(child, nodes.Text):
+                if MATH_MARKER in child:
+                    found['math'] = True
+            elif isinstance(child, nodes.literal_block):
+                found['code'] = True
+            elif isinstance(child, nodes.literal):
+                continue
+            elif isinstance(child, nodes.raw):
+                if MATH_MARKER in child.astext():
+                    found['math'] = True
+            else:
+                if isinstance(child, nodes.table):
+                    found['tables'] = True
+                stack.append(child)
+    return found
+
+def _init_env(env):
+    if not hasattr(env, 'page_assets'):
+        env.page_assets = {}
+
+def record_assets(app, doctree):
+    _init_env(app.env)
+    app.env.page_assets[app.env.docname] = scan_assets(doctree)
+
+def purge_assets(app, env, docname):
+    _init_env(env)
+    env.page_assets.pop(docname, None)
+
+def merge_assets(app, env, docnames, other):
+    _init_env(env)
+    for docname in docnames:
+        if docname in getattr(other, 'page_assets', {}):
+            env.page_assets[docname] = other.page_assets[docname]
+
+def page_flags(env, pagename):
+    return getattr(env, 'page_assets', {}).get(pagename, dict.fromkeys(FLAGS, False))
+
+def add_asset_flags(app, pagename, templatename, context, doctree):
+    for flag, value in page_flags(app.env, pagename).items():
+        context[f'page_has_{flag}'] = value
+    # Menu titles may contain math too (see menu.py).
+    if MATH_MARKER in context.get('sidebar_menu', ''):
+        context['page_has_math'] = True
+
+def setup(app):
+    app.connect('doctree-read', record_assets)
+    app.connect('env-purge-doc', purge_assets)
+    app.connect('env-merge-info', merge_assets)
+    app.connect('html-page-context', add_asset_flags, priority=600)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -1,17 +1,20 @@
+import hashlib
+import json
+import os
 import re
+import time
+import yaml
 from docutils import nodes
+from docutils.parsers.rst import directives
 from sphinx.transforms.post_transforms import SphinxPostTransform
+from sphinx.util.docutils import SphinxDirective
 from sphinx.util import logging
+from src.helper import cache
 
 logger = logging.getLogger(__name__)
 
-def is_inside_reference(node):
-    parent = getattr(node, 'parent', None)
-    while parent is not None:
-        if isinstance(parent, nodes.reference):
-            return True
-        parent = getattr(parent, 'parent', None)
-    return False
+CACHE_NAME = 'autolink.pickle'
+CACHE_VERSION = 1
 
 def get_delimiters(autolink_config):
     delimiters = [("{", "}")]
@@ -33,6 +36,17 @@ def build_delimiter_regex(delimiters):
     pattern = "|".join(regex_list)
     return re.compile(pattern)
 
+def _source_entries(source_data):
+    """Inline ``entries`` of a source, updated with those of its YAML ``files``."""
+    entries = dict(source_data.get("entries") or {})
+    for filename in source_data.get("files", []):
+        try:
+            with open(filename, encoding="utf-8") as f:
+                entries.update(yaml.safe_load(f) or {})
+        except (OSError, yaml.YAMLError) as e:
+            logger.warning(f"[autolink] Could not read {filename}: {e}")
+    return entries
+
 def _collect_terms(autolinks):
     sources = {}
     global_terms = {}
@@ -43,7 +57,7 @@ def _collect_terms(autolinks):
             continue
         if not isinstance(source_data, dict):
             continue
-        entries = source_data.get("entries", {})
+        entries = _source_entries(source_data)
         s_classes = source_data.get("classes") or source_data.get("class") or []
         if isinstance(s_classes, str):
             s_classes = s_classes.split()
@@ -61,111 +75,426 @@ def _collect_terms(autolinks):
                         sources[source][term.lower()] = (entry_key, entry)
     return sources, global_terms, source_classes
 
+def _entry_classes(entry):
+    ec = entry.get("classes") or entry.get("class") or []
+    if isinstance(ec, str):
+        ec = ec.split()
+    return list(ec)
+
+class AutoLinkIndex:
+    """Read-only lookup tables compiled from the ``autolink`` config value."""
+    __slots__ = ("pattern", "sources", "global_terms", "term_count")
+
+    def __init__(self, pattern, sources, global_terms):
+        self.pattern = pattern
+        self.sources = sources
+        self.global_terms = global_terms
+        self.term_count = len(global_terms) + sum(len(m) for m in sources.values())
+
+    def resolve(self, prefix, term):
+        """Return ``(entry_key, entry, classes, digest)`` for a matched term, or None."""
+        term_l = term.lower()
+        if prefix is None:
+            return self.global_terms.get(term_l)
+        source_map = self.sources.get(prefix)
+        if not source_map:
+            return None
+        return source_map.get(term_l)
+
+def compile_index(autolink_config):
+    delimiters = get_delimiters(autolink_config)
+    pattern = build_delimiter_regex(delimiters)
+    sources, global_terms, source_classes = _collect_terms(autolink_config)
+
+    def _link(source, item):
+        entry_key, entry = item
+        classes = ["autolink"] + source_classes.get(source, []) + _entry_classes(entry)
+        digest = hashlib.sha1(
+            json.dumps([entry_key, entry, classes], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        return (entry_key, entry, classes, digest)
+
+    compiled_sources = {
+        source: {term: _link(source, item) for term, item in terms.items()}
+        for source, terms in sources.items()
+    }
+    compiled_global = {term: _link("global", item) for term, item in global_terms.items()}
+    return AutoLinkIndex(pattern, compiled_sources, compiled_global)
+
+def _index_key(autolink_config):
+    """Identify a compiled index by the config and the stats of its YAML files."""
+    files = []
+    for source_data in autolink_config.values():
+        if not isinstance(source_data, dict):
+            continue
+        for filename in source_data.get("files", []):
+            try:
+                st = os.stat(filename)
+                files.append((filename, st.st_mtime_ns, st.st_size))
+            except OSError:
+                files.append((filename, None, None))
+    config_hash = hashlib.sha1(
+        json.dumps(autolink_config, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return (CACHE_VERSION, config_hash, tuple(files))
+
+def load_index(autolink_config):
+    """Return the compiled index, reusing ``.cache/autolink.pickle`` when the
+    config and every YAML source are unchanged."""
+    key = _index_key(autolink_config)
+    cached = cache.load(CACHE_NAME)
+    if cached and cached[0] == key:
+        return cached[1], True
+    index = compile_index(autolink_config)
+    try:
+        cache.dump(CACHE_NAME, (key, index))
+    except Exception as e:
+        logger.warning(f"[autolink] Could not save compiled index: {e}")
+    return index, False
+
+def build_index(app):
+    autolink_config = app.config.autolink
+    if not autolink_config:
+        app.autolink_index = None
+        return
+    start = time.perf_counter()
+    index, cached = load_index(autolink_config)
+    app.autolink_index = index
+    app.autolink_index_key = _index_key(autolink_config)
+    logger.info(
+        f"[autolink] {'Loaded' if cached else 'Compiled'} {index.term_count} terms in "
+        f"{(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+
+def get_index(app):
+    if not hasattr(app, "autolink_index"):
+        build_index(app)
+    return app.autolink_index
+
+def refresh_index(app):
+    """Recompile the index when a YAML source changed since it was built, so
+    an application reused across builds (see devserver.py) sees the edit."""
+    if app.config.autolink and getattr(app, "autolink_index_key", None) != _index_key(app.config.autolink):
+        build_index(app)
+    return get_index(app)
+
+def link_text(text, index):
+    """Split ``text`` around matched terms, or return None if nothing matched."""
+    matches = list(index.pattern.finditer(text))
+    if not matches:
+        return None
+
+    new_nodes = []
+    last_idx = 0
+
+    for match in matches:
+        matched_full = match.group(0)
+        prefix = match.group(1)
+        body = match.group(2)
+        global_body = match.group(3)
+
+        if match.start() > last_idx:
+            new_nodes.append(nodes.Text(text[last_idx:match.start()]))
+
+        link = None
+        entry_term = None
+        if prefix and body:
+            entry_term = body.strip()
+            link = index.resolve(prefix.strip(), entry_term)
+        elif global_body:
+            entry_term = global_body.strip()
+            link = index.resolve(None, entry_term)
+
+        url = None
+        if link is not None:
+            entry_key, entry, classes, _ = link
+            url = entry.get("url")
+
+        if url and entry_term:
+            ref_attribs = {'refuri': url, 'classes': list(classes)}
+            style = entry.get("style")
+            if style:
+                ref_attribs["style"] = style
+            ref_node = nodes.reference(**ref_attribs)
+            ref_node += nodes.Text(entry_term)
+            new_nodes.append(ref_node)
+        else:
+            new_nodes.append(nodes.Text(matched_full))
+
+        last_idx = match.end()
+
+    if last_idx < len(text):
+        new_nodes.append(nodes.Text(text[last_idx:]))
+    return new_nodes
+
+def link_terms(document, index):
+    """Replace term markup in a single depth-first pass over ``document``.
+
+    Whether we are below a reference is carried on the stack instead of being
+    recomputed from the ancestors of every text node, and each parent gets its
+    children list rebuilt at most once.
+    """
+    stack = [(document, False)]
+    while stack:
+        node, inside_reference = stack.pop()
+        new_children = None
+        for i, child in enumerate(node.children):
+            replacement = None
+            if isinstance(child, nodes.Text):
+                if not inside_reference:
+                    replacement = link_text(child.astext(), index)
+            else:
+                stack.append((child, inside_reference or isinstance(child, nodes.reference)))
+
+            if replacement is None:
+                if new_children is not None:
+                    new_children.append(child)
+                continue
+            if new_children is None:
+                new_children = node.children[:i]
+            new_children.extend(replacement)
+
+        if new_children is not None:
+            node.children = new_children
+            for child in new_children:
+                child.parent = node
+
+def _text_nodes(document):
+    """Yield the text nodes of ``document`` that are not inside a reference."""
+    stack = [(document, False)]
+    while stack:
+        node, inside_reference = stack.pop()
+        for child in node.children:
+            if isinstance(child, nodes.Text):
+                if not inside_reference:
+                    yield child
+            else:
+                stack.append((child, inside_reference or isinstance(child, nodes.reference)))
+
+def collect_terms(document, index):
+    """Scan the term markup of ``document``.
+
+    Returns ``(refs, usage)``: ``refs`` maps every ``(prefix, term)`` to the
+    digest of the entry it resolves to (None when unresolved), ``usage`` counts
+    the references to each resolved ``(source, entry_key)``.
+    """
+    refs = {}
+    usage = {}
+    for text_node in _text_nodes(document):
+        for match in index.pattern.finditer(text_node.astext()):
+            prefix, body, global_body = match.group(1, 2, 3)
+            if prefix and body:
+                key = (prefix.strip(), body.strip().lower())
+            elif global_body:
+                key = (None, global_body.strip().lower())
+            else:
+                continue
+            link = index.resolve(*key)
+            if key not in refs:
+                refs[key] = link[3] if link else None
+            if link:
+                entry_id = (key[0] or "global", link[0])
+                usage[entry_id] = usage.get(entry_id, 0) + 1
+    return refs, usage
+
+def _init_env(env):
+    if not hasattr(env, 'autolink_refs'):
+        env.autolink_refs = {}
+    if not hasattr(env, 'autolink_usage'):
+        env.autolink_usage = {}
+        env.autolink_reverse = {}
+        env.autolink_dirty_entries = set()
+        env.autolink_backlink_docs = {}
+
+def _add_usage(env, docname, usage):
+    env.autolink_usage[docname] = usage
+    for entry_id, count in usage.items():
+        env.autolink_reverse.setdefault(entry_id, {})[docname] = count
+    env.autolink_dirty_entries.update(usage)
+
+def _remove_usage(env, docname):
+    usage = env.autolink_usage.pop(docname, {})
+    for entry_id in usage:
+        pages = env.autolink_reverse.get(entry_id)
+        if pages is not None:
+            pages.pop(docname, None)
+            if not pages:
+                del env.autolink_reverse[entry_id]
+    env.autolink_dirty_entries.update(usage)
+
+def record_terms(app, doctree):
+    index = get_index(app)
+    env = app.env
+    _init_env(env)
+    wanted = {
+        (node['source'], node['entry'])
+        for node in doctree.traverse(referenced_from_placeholder)
+    }
+    if wanted:
+        env.autolink_backlink_docs[env.docname] = wanted
+    if index is None:
+        return
+    refs, usage = collect_terms(doctree, index)
+    env.autolink_refs[env.docname] = refs
+    _add_usage(env, env.docname, usage)
+
+def purge_terms(app, env, docname):
+    _init_env(env)
+    env.autolink_refs.pop(docname, None)
+    env.autolink_backlink_docs.pop(docname, None)
+    _remove_usage(env, docname)
+
+def merge_terms(app, env, docnames, other):
+    _init_env(env)
+    _init_env(other)
+    for docname in docnames:
+        if docname in other.autolink_refs:
+            env.autolink_refs[docname] = other.autolink_refs[docname]
+        if docname in other.autolink_backlink_docs:
+            env.autolink_backlink_docs[docname] = other.autolink_backlink_docs[docname]
+        if docname in other.autolink_usage:
+            _add_usage(env, docname, other.autolink_usage[docname])
+
+def outdated_term_docs(app, env, added, changed, removed):
+    """Documents using an entry that was added, edited or removed in the YAML."""
+    index = refresh_index(app)
+    if index is None:
+        return []
+    outdated = []
+    for docname, refs in getattr(env, 'autolink_refs', {}).items():
+        if docname in changed or docname in removed:
+            continue
+        for key, digest in refs.items():
+            link = index.resolve(*key)
+            if (link[3] if link else None) != digest:
+                outdated.append(docname)
+                break
+    if outdated:
+        logger.info(f"[autolink] {len(outdated)} document(s) use changed terms")
+    return outdated
+
+def _matching_entries(wanted, entry_ids):
+    """The ``(source, entry_key)`` ids among ``entry_ids`` that a placeholder
+    asking for ``wanted`` refers to; a None source matches every source."""
+    source, entry_key = wanted
+    if source is not None:
+        return [(source, entry_key)] if (source, entry_key) in entry_ids else []
+    return [entry_id for entry_id in entry_ids if entry_id[1] == entry_key]
+
+def outdated_backlink_docs(app, env):
+    """Rewrite the pages whose "referenced from" lists changed during reading."""
+    _init_env(env)
+    dirty = env.autolink_dirty_entries
+    env.autolink_dirty_entries = set()
+    if not dirty:
+        return []
+    dirty_keys = {entry_key for _, entry_key in dirty}
+    outdated = []
+    for docname, wanted in env.autolink_backlink_docs.items():
+        for source, entry_key in wanted:
+            if (source, entry_key) in dirty or (source is None and entry_key in dirty_keys):
+                outdated.append(docname)
+                break
+    return outdated
+
+def write_usage_index(app, exception):
+    if exception is not None or app.builder.format != 'html':
+        return
+    reverse = getattr(app.env, 'autolink_reverse', {})
+    data = {
+        f"{source}:{entry_key}": dict(sorted(pages.items()))
+        for (source, entry_key), pages in sorted(reverse.items())
+    }
+    target = os.path.join(app.outdir, app.config.autolink_usage_file)
+    with open(target, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+class referenced_from_placeholder(nodes.General, nodes.Element):
+    pass
+
+class ReferencedFromDirective(SphinxDirective):
+    """List the pages that link to a glossary entry, e.g.::
+
+        ```{referenced-from} logic/afirmacao
+        :source: logic
+        ```
+    """
+    has_content = False
+    required_arguments = 1
+    optional_arguments = 0
+    final_argument_whitespace = False
+    option_spec = {
+        'source': directives.unchanged,
+    }
+
+    def run(self):
+        node = referenced_from_placeholder()
+        node['entry'] = self.arguments[0].strip()
+        node['source'] = self.options.get('source', '').strip() or None
+        return [node]
+
 class AutoLinkPostTransform(SphinxPostTransform):
     default_priority = 900
     def run(self):
-        autolink_config = self.app.config.autolink
-        if not autolink_config:
+        index = get_index(self.app)
+        if index is None:
             logger.warning("autolink extension: 'autolink' not defined in conf.py.")
             return
+        link_terms(self.document, index)
 
-        delimiters = get_delimiters(autolink_config)
-        term_pattern = build_delimiter_regex(delimiters)
+class ReferencedFromPostTransform(SphinxPostTransform):
+    default_priority = 890
 
-        sources, global_terms, source_classes = _collect_terms(autolink_config)
-
-        for text_node in list(self.document.traverse(nodes.Text)):
-            parent = text_node.parent
-            if parent is None:
-                continue
-            if is_inside_reference(text_node):
-                continue
-
-            text = text_node.astext()
-            matches = list(term_pattern.finditer(text))
-            if not matches:
+    def run(self):
+        placeholders = list(self.document.traverse(referenced_from_placeholder))
+        if not placeholders:
+            return
+        reverse = getattr(self.env, 'autolink_reverse', {})
+        docname = self.env.docname
+        for node in placeholders:
+            pages = {}
+            for entry_id in _matching_entries((node['source'], node['entry']), reverse):
+                for page, count in reverse[entry_id].items():
+                    pages[page] = pages.get(page, 0) + count
+            pages.pop(docname, None)
+            if not pages:
+                node.replace_self([])
                 continue
 
-            new_nodes = []
-            last_idx = 0
-
-            for match in matches:
-                matched_full = match.group(0)
-                prefix = match.group(1)
-                body = match.group(2)
-                global_body = match.group(3)
-
-                if match.start() > last_idx:
-                    new_nodes.append(nodes.Text(text[last_idx:match.start()]))
-
-                classes = []
-                url = None
-                entry_label = None
-
-                if prefix and body:
-                    source = prefix.strip()
-                    entry_term = body.strip()
-                    term_l = entry_term.lower()
-                    source_map = sources.get(source)
-                    if source_map and term_l in source_map:
-                        entry_key, entry = source_map[term_l]
-                        url = entry.get("url")
-                        entry_label = entry_term
-                        classes = ["autolink"]
-                        classes += source_classes.get(source, [])
-                        if entry.get("classes") or entry.get("class"):
-                            ec = entry.get("classes") or entry.get("class")
-                            if isinstance(ec, str): ec = ec.split()
-                            classes += list(ec)
-                    else:
-                        new_nodes.append(nodes.Text(matched_full))
-                        last_idx = match.end()
-                        continue
-
-                elif global_body:
-                    entry_term = global_body.strip()
-                    term_l = entry_term.lower()
-                    if term_l in global_terms:
-                        entry_key, entry = global_terms[term_l]
-                        url = entry.get("url")
-                        entry_label = entry_term
-                        classes = ["autolink"]
-                        classes += source_classes.get("global", [])
-                        if entry.get("classes") or entry.get("class"):
-                            ec = entry.get("classes") or entry.get("class")
-                            if isinstance(ec, str): ec = ec.split()
-                            classes += list(ec)
-                    else:
-                        new_nodes.append(nodes.Text(matched_full))
-                        last_idx = match.end()
-                        continue
-
-                if url and entry_label:
-                    ref_attribs = {'refuri': url, 'classes': classes}
-                    style = entry.get("style")
-                    if style:
-                        ref_attribs["style"] = style
-                    ref_node = nodes.reference(**ref_attribs)
-                    ref_node += nodes.Text(entry_label)
-                    new_nodes.append(ref_node)
-                else:
-                    new_nodes.append(nodes.Text(matched_full))
-
-                last_idx = match.end()
-
-            if last_idx < len(text):
-                new_nodes.append(nodes.Text(text[last_idx:]))
-            idx = parent.index(text_node)
-            parent.children[idx:idx+1] = new_nodes
-            for node in new_nodes:
-                node.parent = parent
+            bullets = nodes.bullet_list(classes=['referenced-from'])
+            for page in sorted(pages):
+                title = self.env.metadata.get(page, {}).get('title')
+                if not title:
+                    title_node = self.env.titles.get(page)
+                    title = title_node.astext() if title_node else page
+                uri = self.app.builder.get_relative_uri(docname, page)
+                li = nodes.list_item()
+                p = nodes.paragraph()
+                ref = nodes.reference('', '', internal=True, refuri=uri)
+                ref += nodes.Text(title)
+                p += ref
+                if pages[page] > 1:
+                    p += nodes.Text(f" ({pages[page]})")
+                li += p
+                bullets += li
+            node.replace_self(bullets)
 
 def setup(app):
     app.add_config_value('autolink', {}, 'env')
+    app.add_config_value('autolink_usage_file', 'autolink-usage.json', 'html')
+    app.add_node(referenced_from_placeholder)
+    app.add_directive('referenced-from', ReferencedFromDirective)
+    app.connect('builder-inited', build_index)
+    app.connect('doctree-read', record_terms)
+    app.connect('env-purge-doc', purge_terms)
+    app.connect('env-merge-info', merge_terms)
+    app.connect('env-get-outdated', outdated_term_docs)
+    app.connect('env-updated', outdated_backlink_docs)
+    app.connect('build-finished', write_usage_index)
     app.add_post_transform(AutoLinkPostTransform)
+    app.add_post_transform(ReferencedFromPostTransform)
     return {
-        'version': '0.7',
+        'version': '0.11',
         'parallel_read_safe': True,
         'parallel_write_safe': True,
     }
-
@@ -0,0 +1,31 @@
+import os
+import pickle
+import tempfile
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+CACHE_DIR = os.environ.get('SITE_CACHE_DIR', os.path.join(ROOT_DIR, '.cache'))
+
+def cache_path(name):
+    return os.path.join(CACHE_DIR, name)
+
+def load(name, default=None):
+    """Unpickle ``.cache/<name>``, falling back to ``default`` on any error."""
+    try:
+        with open(cache_path(name), 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return default
+
+def dump(name, data):
+    """Atomically pickle ``data`` into ``.cache/<name>``."""
+    target = cache_path(name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, target)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
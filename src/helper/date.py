@@ -1,7 +1,54 @@
-from datetime import datetime
+import os
+from datetime import datetime, timezone
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+STAMP_FILE = 'buildstamp.js'
+
+def _build_time():
+  epoch = os.environ.get('SOURCE_DATE_EPOCH')
+  if epoch:
+    try:
+      return datetime.fromtimestamp(int(epoch), tz=timezone.utc)
+    except ValueError:
+      logger.warning(f"[date] Ignoring invalid SOURCE_DATE_EPOCH={epoch!r}")
+  return datetime.now()
 
 def _year():
-  return datetime.now().year
+  return _build_time().year
 
 def _now():
-  return datetime.now().strftime("%Y/%m/%d at %H:%M")
+  return _build_time().strftime("%Y/%m/%d at %H:%M")
+
+def write_build_stamp(app, exception):
+  """Write the build time to a single shared script instead of every page,
+  so pages stay byte-identical and the config does not change between builds."""
+  if exception is not None or app.builder.format != 'html':
+    return
+  static_dir = os.path.join(app.outdir, '_static')
+  os.makedirs(static_dir, exist_ok=True)
+  target = os.path.join(static_dir, STAMP_FILE)
+  content = (
+    'document.addEventListener("DOMContentLoaded", function() {\n'
+    '  document.querySelectorAll(".build-stamp").forEach(function(el) {\n'
+    f'    el.textContent = "{_now()}";\n'
+    '  });\n'
+    '});\n'
+  )
+  try:
+    with open(target, encoding='utf-8') as f:
+      if f.read() == content:
+        return
+  except OSError:
+    pass
+  with open(target, 'w', encoding='utf-8') as f:
+    f.write(content)
+
+def setup(app):
+  app.connect('build-finished', write_build_stamp)
+  return {
+    'version': '0.1',
+    'parallel_read_safe': True,
+    'parallel_write_safe': True,
+  }
@@ -0,0 +1,196 @@
+"""Development server with incremental rebuilds and live reload."""
+import argparse
+import http.server
+import os
+import sys
+import threading
+import time
+from functools import partial
+from sphinx.application import Sphinx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+SRC_DIR = os.path.join(ROOT, 'src')
+CONTENT_DIR = os.path.join(ROOT, 'content')
+WATCHED = [
+    CONTENT_DIR,
+    os.path.join(SRC_DIR, 'templates'),
+    os.path.join(SRC_DIR, 'static'),
+    os.path.join(SRC_DIR, 'yml'),
+]
+CONF_FILE = os.path.join(SRC_DIR, 'conf.py')
+RELOAD_PATH = '/__reload'
+RELOAD_SCRIPT = (
+    '<script>new EventSource("%s").onmessage = function() { location.reload(); };</script>'
+    % RELOAD_PATH
+).encode('utf-8')
+
+class BuildState:
+    """Build counter shared between the watcher and the SSE clients."""
+
+    def __init__(self):
+        self.generation = 0
+        self.condition = threading.Condition()
+
+    def bump(self):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def wait(self, generation, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.generation != generation, timeout)
+            return self.generation
+
+def snapshot(paths):
+    """``{path: (mtime_ns, size)}`` for every file below ``paths``."""
+    stats = {}
+    stack = [p for p in paths if os.path.exists(p)]
+    while stack:
+        current = stack.pop()
+        if os.path.isfile(current):
+            st = os.stat(current)
+            stats[current] = (st.st_mtime_ns, st.st_size)
+            continue
+        with os.scandir(current) as it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    st = entry.stat()
+                    stats[entry.path] = (st.st_mtime_ns, st.st_size)
+    return stats
+
+def changed_files(before, after):
+    return sorted(
+        path for path in before.keys() | after.keys()
+        if before.get(path) != after.get(path)
+    )
+
+class ReloadHandler(http.server.SimpleHTTPRequestHandler):
+    """Static handler that resolves extensionless links like the production
+    server, injects the reload script into HTML pages and streams build
+    events on ``RELOAD_PATH``."""
+
+    state = None
+
+    def translate_path(self, path):
+        translated = super().translate_path(path)
+        if not os.path.exists(translated) and os.path.isfile(translated + '.html'):
+            return translated + '.html'
+        return translated
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            return self._stream_events()
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, 'index.html')
+        if not path.endswith('.html') or not os.path.isfile(path):
+            return super().do_GET()
+        with open(path, 'rb') as f:
+            body = f.read()
+        marker = body.rfind(b'</body>')
+        if marker == -1:
+            marker = len(body)
+        body = body[:marker] + RELOAD_SCRIPT + body[marker:]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_events(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        generation = self.state.generation
+        try:
+            while True:
+                current = self.state.wait(generation, timeout=15)
+                if current != generation:
+                    generation = current
+                    self.wfile.write(b'data: reload\n\n')
+                else:
+                    self.wfile.write(b': ping\n\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+def create_app(builddir):
+    return Sphinx(
+        srcdir=CONTENT_DIR,
+        confdir=SRC_DIR,
+        outdir=os.path.join(builddir, 'html'),
+        doctreedir=os.path.join(builddir, 'doctrees'),
+        buildername='html',
+        status=sys.stdout,
+        warning=sys.stderr,
+        freshenv=False,
+    )
+
+def build(app):
+    start = time.perf_counter()
+    try:
+        app.build()
+    except Exception as e:
+        print(f"[devserver] Build failed: {e}", file=sys.stderr)
+        return False
+    print(f"[devserver] Built in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return True
+
+def serve(state, outdir, host, port):
+    handler = partial(type('Handler', (ReloadHandler,), {'state': state}), directory=outdir)
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def watch(app, builddir, state, interval):
+    stats = snapshot(WATCHED + [CONF_FILE])
+    while True:
+        time.sleep(interval)
+        current = snapshot(WATCHED + [CONF_FILE])
+        changed = changed_files(stats, current)
+        if not changed:
+            continue
+        stats = current
+        print(f"[devserver] Changed: {', '.join(os.path.relpath(p, ROOT) for p in changed)}")
+        if CONF_FILE in changed:
+            print("[devserver] conf.py changed, restarting the application")
+            app = create_app(builddir)
+        if build(app):
+            state.bump()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('builddir', nargs='?', default=os.path.join(ROOT, 'dist'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help='seconds between two scans of the watched directories')
+    args = parser.parse_args(argv)
+
+    builddir = os.path.abspath(args.builddir)
+    app = create_app(builddir)
+    build(app)
+    state = BuildState()
+    server = serve(state, str(app.outdir), args.host, args.port)
+    print(f"[devserver] Serving {app.outdir} on http://{args.host}:{args.port}")
+    try:
+        watch(app, builddir, state, args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,35 +1,48 @@
 import os
-import re
-import yaml
 from sphinx.util import logging
+from src.helper import frontmatter
 
 logger = logging.getLogger(__name__)
 
-DRAFT_DOCNAMES = set()
-
 def setup(app):
-    app.connect('source-read', filter_draft_doc)
-    return {'version': '1.0', 'parallel_read_safe': True}
+    app.setup_extension('src.helper.frontmatter')
+    app.connect('env-get-outdated', exclude_drafts)
+    return {
+        'version': '2.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
+
+def _source_suffixes(config):
+    suffixes = config.source_suffix
+    if isinstance(suffixes, str):
+        return [suffixes]
+    return list(suffixes)
+
+def exclude_drafts(app, env, added, changed, removed):
+    """Drop drafts from ``found_docs`` before anything is read.
 
-def parse_frontmatter(src):
-    m = re.match(r'^---\s*\n(.*?\n?)^---\s*(?:\n|$)', src, re.DOTALL | re.MULTILINE)
-    if not m:
-        return None
-    try:
-        return yaml.safe_load(m.group(1))
-    except Exception:
-        return None
+    Drafts are detected from the shared frontmatter index. A doc that became a
+    draft since the last build is purged like a deleted file and its HTML
+    output is removed, so drafts cost nothing in read and write and leave no
+    stray pages behind.
+    """
+    suffixes = _source_suffixes(app.config)
+    drafts = set()
+    for docname in env.found_docs:
+        filepath = frontmatter.find_source(app.srcdir, docname, suffixes)
+        if filepath and frontmatter.is_draft(filepath):
+            drafts.add(docname)
 
-def filter_draft_doc(app, docname, source):
-    srcdir = app.srcdir
-    for ext in ('.md', '.rst'):
-        fname = os.path.join(srcdir, docname.replace("/", os.sep) + ext)
-        if not os.path.isfile(fname):
-            continue
-        with open(fname, encoding="utf-8") as f:
-            meta = parse_frontmatter(f.read(2048))
-        if isinstance(meta, dict) and meta.get("draft", False):
-            logger.info(f"[draft] Excluding doc: {docname} (marked as draft in frontmatter)")
-            source[0] = ""  # Provide an empty docstring
-            DRAFT_DOCNAMES.add(docname)
-            break
+    for docname in sorted(drafts):
+        logger.info(f"[draft] Excluding doc: {docname} (marked as draft in frontmatter)")
+        env.found_docs.discard(docname)
+        added.discard(docname)
+        changed.discard(docname)
+        if docname in env.all_docs:
+            removed.add(docname)
+        if hasattr(app.builder, 'get_outfilename'):
+            outfile = app.builder.get_outfilename(docname)
+            if os.path.isfile(outfile):
+                os.remove(outfile)
+    return []
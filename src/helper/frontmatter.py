@@ -0,0 +1,148 @@
+import os
+import re
+import yaml
+from sphinx.util import logging
+from src.helper import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = 'frontmatter.pickle'
+CACHE_VERSION = 1
+
+FRONTMATTER_REGEX = re.compile(r'^---\s*\n(.*?\n?)^---\s*(?:\n|$)', re.DOTALL | re.MULTILINE)
+HEADING_REGEX = re.compile(r'^\s*#+\s*(.+)')
+TRUE_STRINGS = ("true", "yes", "on", "1")
+
+# path -> (mtime_ns, size, record)
+_INDEX = None
+_DIRTY = False
+
+def _load_index():
+    global _INDEX
+    if _INDEX is None:
+        data = cache.load(CACHE_NAME, {})
+        if data.get('version') == CACHE_VERSION:
+            _INDEX = data.get('entries', {})
+        else:
+            _INDEX = {}
+    return _INDEX
+
+def _parse(filepath):
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read()
+    meta = {}
+    rest = content
+    m = FRONTMATTER_REGEX.match(content)
+    if m:
+        rest = content[m.end():]
+        try:
+            meta = yaml.safe_load(m.group(1)) or {}
+        except Exception as e:
+            logger.warning(f"[frontmatter] Could not parse frontmatter in {filepath}: {e}")
+            meta = {}
+        if not isinstance(meta, dict):
+            meta = {}
+    heading = None
+    for i, line in enumerate(rest.splitlines()):
+        if i > 20:
+            break
+        h = HEADING_REGEX.match(line)
+        if h:
+            heading = h.group(1).strip()
+            break
+    return {'meta': meta, 'heading': heading}
+
+def lookup(filepath):
+    """Return the cached record of ``filepath``, reparsing it only if it changed."""
+    global _DIRTY
+    index = _load_index()
+    filepath = os.path.abspath(filepath)
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        if index.pop(filepath, None) is not None:
+            _DIRTY = True
+        return None
+    cached = index.get(filepath)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    try:
+        record = _parse(filepath)
+    except Exception as e:
+        logger.warning(f"[frontmatter] Could not read {filepath}: {e}")
+        return None
+    index[filepath] = (st.st_mtime_ns, st.st_size, record)
+    _DIRTY = True
+    return record
+
+def as_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_STRINGS
+    return bool(value)
+
+def _record_title(record):
+    if 'title' in record['meta']:
+        return str(record['meta']['title']).strip()
+    return record['heading']
+
+def _record_weight(record):
+    w = record['meta'].get('weight', None)
+    try:
+        return int(w) if w is not None else None
+    except Exception:
+        return None
+
+def get_meta(filepath):
+    record = lookup(filepath)
+    return record['meta'] if record else {}
+
+def get_title(filepath):
+    """Frontmatter ``title``, falling back to the first markdown heading."""
+    record = lookup(filepath)
+    return _record_title(record) if record else None
+
+def get_weight(filepath):
+    record = lookup(filepath)
+    return _record_weight(record) if record else None
+
+def is_draft(filepath):
+    return as_bool(get_meta(filepath).get('draft', False))
+
+def describe(filepath):
+    """Title, weight and draft flag of ``filepath`` from a single lookup."""
+    record = lookup(filepath)
+    if not record:
+        return None
+    return {
+        'title': _record_title(record),
+        'weight': _record_weight(record),
+        'draft': as_bool(record['meta'].get('draft', False)),
+    }
+
+def find_source(srcdir, docname, suffixes=('.md', '.rst')):
+    for suffix in suffixes:
+        candidate = os.path.join(srcdir, docname.replace('/', os.sep) + suffix)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+def save(*args):
+    """Persist the index if anything changed. Usable as an event handler."""
+    global _DIRTY
+    if not _DIRTY or _INDEX is None:
+        return
+    try:
+        cache.dump(CACHE_NAME, {'version': CACHE_VERSION, 'entries': _INDEX})
+        _DIRTY = False
+    except Exception as e:
+        logger.warning(f"[frontmatter] Could not save index: {e}")
+
+def setup(app):
+    app.connect('build-finished', save)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
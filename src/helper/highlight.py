@@ -0,0 +1,95 @@
+import hashlib
+import inspect
+import os
+import pygments
+from functools import wraps
+from sphinx.highlighting import lexer_classes
+from sphinx.util import logging
+from src.helper import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = 'highlight'
+CACHE_VERSION = 1
+# Hits and misses of this process, reported at build-finished.
+_STATS = {'hits': 0, 'misses': 0}
+_LEXER_IDS = {}
+
+def _lexer_id(lang):
+    """Identify a lexer registered through ``app.add_lexer`` by its class and
+    the mtime of its module, so editing a local lexer invalidates its entries.
+    Pygments' own lexers are covered by the Pygments version."""
+    if lang not in _LEXER_IDS:
+        lexer = lexer_classes.get(lang)
+        lexer = getattr(lexer, 'func', lexer)
+        if lexer is None:
+            _LEXER_IDS[lang] = ''
+        else:
+            try:
+                mtime = os.stat(inspect.getfile(lexer)).st_mtime_ns
+            except (TypeError, OSError):
+                mtime = None
+            _LEXER_IDS[lang] = f'{lexer.__module__}.{lexer.__qualname__}:{mtime}'
+    return _LEXER_IDS[lang]
+
+def block_key(source, lang, opts, kwargs, style):
+    key = repr((
+        CACHE_VERSION,
+        pygments.__version__,
+        style,
+        lang,
+        _lexer_id(lang),
+        sorted((opts or {}).items()),
+        sorted(kwargs.items()),
+    ))
+    return hashlib.sha256(key.encode('utf-8') + b'\0' + source.encode('utf-8')).hexdigest()
+
+def cached_highlighter(highlight_block, style):
+    """Wrap ``PygmentsBridge.highlight_block`` with a cache of one file per
+    block under ``.cache/highlight``, written atomically so parallel writers
+    can share it."""
+
+    @wraps(highlight_block)
+    def wrapper(source, lang, opts=None, force=False, location=None, **kwargs):
+        if not isinstance(source, str):
+            source = source.decode()
+        key = block_key(source, lang, opts, dict(kwargs, force=force), style)
+        name = os.path.join(CACHE_NAME, key[:2], key)
+        highlighted = cache.load(name)
+        if highlighted is not None:
+            _STATS['hits'] += 1
+            return highlighted
+        _STATS['misses'] += 1
+        highlighted = highlight_block(source, lang, opts, force, location, **kwargs)
+        try:
+            cache.dump(name, highlighted)
+        except OSError as e:
+            logger.debug(f"[highlight] Could not cache block: {e}")
+        return highlighted
+
+    return wrapper
+
+def install_cache(app):
+    if not app.config.highlight_cache_enabled:
+        return
+    for attr in ('highlighter', 'dark_highlighter'):
+        bridge = getattr(app.builder, attr, None)
+        if bridge is None:
+            continue
+        style = f'{bridge.dest}:{bridge.formatter_args.get("style").__class__.__name__}'
+        bridge.highlight_block = cached_highlighter(bridge.highlight_block, style)
+
+def report(app, exception):
+    if _STATS['hits'] or _STATS['misses']:
+        logger.info(f"[highlight] {_STATS['hits']} cached, {_STATS['misses']} highlighted blocks")
+    _STATS['hits'] = _STATS['misses'] = 0
+
+def setup(app):
+    app.add_config_value('highlight_cache_enabled', True, '')
+    app.connect('builder-inited', install_cache)
+    app.connect('build-finished', report)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
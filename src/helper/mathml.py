@@ -0,0 +1,172 @@
+"""Pure-Python TeX to MathML conversion for the math of the site."""
+import re
+from html import escape
+
+VERSION = '1'
+
+class MathMLError(ValueError):
+    pass
+
+TOKEN_REGEX = re.compile(r'\\[a-zA-Z]+|\\.|[a-zA-Z]|[0-9]+(?:\.[0-9]+)?|\s+|.', re.DOTALL)
+
+GREEK = {
+    'alpha': 'α', 'beta': 'β', 'gamma': 'γ', 'delta': 'δ', 'epsilon': 'ϵ',
+    'varepsilon': 'ε', 'zeta': 'ζ', 'eta': 'η', 'theta': 'θ', 'vartheta': 'ϑ',
+    'iota': 'ι', 'kappa': 'κ', 'lambda': 'λ', 'mu': 'μ', 'nu': 'ν', 'xi': 'ξ',
+    'pi': 'π', 'rho': 'ρ', 'sigma': 'σ', 'tau': 'τ', 'upsilon': 'υ', 'phi': 'ϕ',
+    'varphi': 'φ', 'chi': 'χ', 'psi': 'ψ', 'omega': 'ω', 'Gamma': 'Γ',
+    'Delta': 'Δ', 'Theta': 'Θ', 'Lambda': 'Λ', 'Xi': 'Ξ', 'Pi': 'Π',
+    'Sigma': 'Σ', 'Upsilon': 'Υ', 'Phi': 'Φ', 'Psi': 'Ψ', 'Omega': 'Ω',
+}
+
+IDENTIFIERS = {
+    'emptyset': '∅', 'varnothing': '∅', 'infty': '∞', 'partial': '∂',
+    'top': '⊤', 'bot': '⊥', 'ell': 'ℓ', 'aleph': 'ℵ',
+}
+
+OPERATORS = {
+    'neg': '¬', 'lnot': '¬', 'wedge': '∧', 'land': '∧', 'vee': '∨', 'lor': '∨',
+    'to': '→', 'rightarrow': '→', 'leftarrow': '←', 'gets': '←',
+    'leftrightarrow': '↔', 'Rightarrow': '⇒', 'implies': '⟹', 'Leftarrow': '⇐',
+    'Leftrightarrow': '⇔', 'iff': '⟺', 'mapsto': '↦', 'in': '∈', 'notin': '∉',
+    'ni': '∋', 'sub': '⊂', 'subset': '⊂', 'subseteq': '⊆', 'supset': '⊃',
+    'supseteq': '⊇', 'cup': '∪', 'cap': '∩', 'setminus': '∖', 'forall': '∀',
+    'exists': '∃', 'nexists': '∄', 'cdot': '⋅', 'times': '×', 'div': '÷',
+    'pm': '±', 'mp': '∓', 'circ': '∘', 'leq': '≤', 'le': '≤', 'geq': '≥',
+    'ge': '≥', 'neq': '≠', 'ne': '≠', 'equiv': '≡', 'approx': '≈', 'sim': '∼',
+    'simeq': '≃', 'cong': '≅', 'mid': '∣', 'vdash': '⊢', 'models': '⊨',
+    'ldots': '…', 'dots': '…', 'cdots': '⋯', 'sum': '∑', 'prod': '∏',
+    'int': '∫', 'langle': '⟨', 'rangle': '⟩', 'lbrace': '{', 'rbrace': '}',
+    'vert': '|', 'Vert': '‖', 'oplus': '⊕', 'otimes': '⊗',
+}
+
+SPACES = {',': '0.1667em', ':': '0.2222em', ';': '0.2778em', ' ': '0.25em',
+          'quad': '1em', 'qquad': '2em'}
+
+FONTS = {'mathbb': 'double-struck', 'mathcal': 'script', 'mathbf': 'bold',
+         'mathit': 'italic', 'mathfrak': 'fraktur', 'mathsf': 'sans-serif'}
+
+TEXT_COMMANDS = ('text', 'mathrm', 'operatorname')
+
+class _Parser:
+
+    def __init__(self, tex):
+        self.tokens = TOKEN_REGEX.findall(tex)
+        self.pos = 0
+
+    def peek(self):
+        while self.pos < len(self.tokens) and self.tokens[self.pos].isspace():
+            self.pos += 1
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self):
+        token = self.peek()
+        if token is None:
+            raise MathMLError('unexpected end of expression')
+        self.pos += 1
+        return token
+
+    def raw_group(self):
+        """The source text of a ``{...}`` argument, for text-like commands."""
+        if self.next() != '{':
+            raise MathMLError('expected {')
+        depth, parts = 1, []
+        while True:
+            if self.pos >= len(self.tokens):
+                raise MathMLError('unexpected end of expression')
+            token = self.tokens[self.pos]
+            self.pos += 1
+            depth += {'{': 1, '}': -1}.get(token, 0)
+            if depth == 0:
+                return ''.join(parts)
+            parts.append(token)
+
+    def expression(self, stop=None):
+        items = []
+        while self.peek() is not None and self.peek() != stop:
+            items.append(self.scripted())
+        return items
+
+    def scripted(self):
+        base = self.atom()
+        sub = sup = None
+        while self.peek() in ('_', '^'):
+            if self.next() == '_':
+                sub = self.atom()
+            else:
+                sup = self.atom()
+        if sub and sup:
+            return f'<msubsup>{base}{sub}{sup}</msubsup>'
+        if sub:
+            return f'<msub>{base}{sub}</msub>'
+        if sup:
+            return f'<msup>{base}{sup}</msup>'
+        return base
+
+    def group(self):
+        items = self.expression(stop='}')
+        self.next()
+        return _row(items)
+
+    def atom(self):
+        token = self.next()
+        if token == '{':
+            return self.group()
+        if token in ('}', '_', '^', '&') or token == '\\\\':
+            raise MathMLError(f'unsupported token {token!r}')
+        if token.startswith('\\'):
+            return self.command(token[1:])
+        if token.isalpha():
+            return f'<mi>{escape(token)}</mi>'
+        if token[0].isdigit():
+            return f'<mn>{token}</mn>'
+        if token == "'":
+            return '<mo>′</mo>'
+        return f'<mo>{escape(token)}</mo>'
+
+    def command(self, name):
+        if name in GREEK:
+            return f'<mi>{GREEK[name]}</mi>'
+        if name in IDENTIFIERS:
+            return f'<mi>{IDENTIFIERS[name]}</mi>'
+        if name in OPERATORS:
+            return f'<mo>{OPERATORS[name]}</mo>'
+        if name in SPACES:
+            return f'<mspace width="{SPACES[name]}"/>'
+        if name in ('{', '}', '|', '#', '%', '$', '_'):
+            return f'<mo>{escape(name)}</mo>'
+        if name in ('left', 'right'):
+            delimiter = self.next()
+            if delimiter == '.':
+                return '<mrow></mrow>'
+            self.pos -= 1
+            return self.atom()
+        if name == 'frac':
+            return f'<mfrac>{self.atom()}{self.atom()}</mfrac>'
+        if name == 'sqrt':
+            return f'<msqrt>{self.atom()}</msqrt>'
+        if name in FONTS:
+            text = self.raw_group()
+            return f'<mi mathvariant="{FONTS[name]}">{escape(text)}</mi>'
+        if name in TEXT_COMMANDS:
+            text = self.raw_group()
+            tag = 'mtext' if name == 'text' else 'mi'
+            return f'<{tag} mathvariant="normal">{escape(text)}</{tag}>'
+        raise MathMLError(f'unsupported command \\{name}')
+
+def _row(items):
+    return items[0] if len(items) == 1 else f"<mrow>{''.join(items)}</mrow>"
+
+def render(tex, display=False):
+    """Return the ``<math>`` element for ``tex``, or raise ``MathMLError``."""
+    parser = _Parser(tex)
+    items = parser.expression()
+    if parser.peek() is not None:
+        raise MathMLError(f'unbalanced {parser.peek()!r}')
+    mode = 'block' if display else 'inline'
+    return (
+        f'<math xmlns="http://www.w3.org/1998/Math/MathML" display="{mode}">'
+        f'<semantics><mrow>{"".join(items)}</mrow>'
+        f'<annotation encoding="application/x-tex">{escape(tex)}</annotation>'
+        f'</semantics></math>'
+    )
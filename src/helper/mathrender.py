@@ -0,0 +1,126 @@
+"""Optional build-time rendering of the :tex ...: math (math_renderer)."""
+import hashlib
+import os
+import re
+from docutils import nodes
+from sphinx.transforms import SphinxTransform
+from sphinx.util import logging
+from src.helper import cache, mathml
+
+try:
+    from latex2mathml import converter as latex2mathml
+except ImportError:
+    latex2mathml = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = 'math'
+# The delimiters of KaTeX's auto-render in layout.html.
+MATH_REGEX = re.compile(r':::tex(.+?):::|:tex([^:]+?):', re.DOTALL)
+SKIPPED_NODES = (nodes.literal, nodes.literal_block, nodes.raw, nodes.comment)
+# Cached failures, so rejected expressions are not retried on every build.
+FAILED = ''
+# Spans of this process, reported at build-finished.
+_STATS = {'rendered': 0, 'katex': 0}
+
+def _mathml(tex, display):
+    return mathml.render(tex, display)
+_mathml.version = mathml.VERSION
+
+def _latex2mathml(tex, display):
+    return latex2mathml.convert(tex, display='block' if display else 'inline')
+
+RENDERERS = {'mathml': _mathml}
+if latex2mathml is not None:
+    RENDERERS['latex2mathml'] = _latex2mathml
+
+def get_renderer(config):
+    name = config.math_renderer
+    if not name:
+        return None, None
+    renderers = dict(RENDERERS, **config.math_renderers)
+    if name not in renderers:
+        logger.warning(f"[mathrender] Unknown math_renderer {name!r}, leaving math to KaTeX")
+        return None, None
+    return name, renderers[name]
+
+def render_cached(name, renderer, tex, display):
+    """Rendered HTML for ``tex``, or None when the renderer rejects it."""
+    version = getattr(renderer, 'version', '')
+    key = hashlib.sha256(f'{name}\0{version}\0{display:d}\0{tex}'.encode('utf-8')).hexdigest()
+    entry = os.path.join(CACHE_NAME, key[:2], key)
+    html = cache.load(entry)
+    if html is None:
+        try:
+            html = renderer(tex, display)
+        except Exception as e:
+            logger.info(f"[mathrender] Leaving {tex!r} to KaTeX: {e}")
+            html = FAILED
+        try:
+            cache.dump(entry, html)
+        except OSError as e:
+            logger.debug(f"[mathrender] Could not cache {tex!r}: {e}")
+    return html or None
+
+def _math_nodes(text, name, renderer):
+    """Split ``text`` into text and raw MathML nodes, or None if no span
+    could be rendered."""
+    new_nodes = []
+    last = 0
+    rendered = False
+    for match in MATH_REGEX.finditer(text):
+        display = match.group(1) is not None
+        tex = (match.group(1) if display else match.group(2)).strip()
+        html = render_cached(name, renderer, tex, display)
+        if html is None:
+            _STATS['katex'] += 1
+            continue
+        _STATS['rendered'] += 1
+        if match.start() > last:
+            new_nodes.append(nodes.Text(text[last:match.start()]))
+        new_nodes.append(nodes.raw('', html, format='html'))
+        last = match.end()
+        rendered = True
+    if not rendered:
+        return None
+    if last < len(text):
+        new_nodes.append(nodes.Text(text[last:]))
+    return new_nodes
+
+class MathPrerenderTransform(SphinxTransform):
+    # Before DoctreeReadEvent (880), so assets.py only sees the math that is
+    # still left to KaTeX.
+    default_priority = 870
+
+    def apply(self):
+        name, renderer = get_renderer(self.config)
+        if renderer is None:
+            return
+        stack = [self.document]
+        while stack:
+            node = stack.pop()
+            for child in list(node.children):
+                if isinstance(child, nodes.Text):
+                    if ':tex' not in child:
+                        continue
+                    replacement = _math_nodes(child.astext(), name, renderer)
+                    if replacement:
+                        child.parent.replace(child, replacement)
+                elif not isinstance(child, SKIPPED_NODES):
+                    stack.append(child)
+
+def report(app, exception):
+    if _STATS['rendered'] or _STATS['katex']:
+        logger.info(f"[mathrender] {_STATS['rendered']} spans rendered, {_STATS['katex']} left to KaTeX")
+    _STATS['rendered'] = _STATS['katex'] = 0
+
+def setup(app):
+    app.add_config_value('math_renderer', None, 'env')
+    app.add_config_value('math_renderers', {}, 'env')
+    app.add_transform(MathPrerenderTransform)
+    app.connect('build-finished', report)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
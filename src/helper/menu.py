@@ -1,49 +1,29 @@
+import hashlib
+import json
 import os
 import re
-import yaml
+from jinja2 import TemplateNotFound
+from markupsafe import escape
+from sphinx.util import logging
+from src.helper import cache, frontmatter
 
-def _parse_frontmatter(filepath):
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read(4096)
-        m = re.match(r'^---\s*\n(.*?)(?:\n)?---\s*\n', content, re.DOTALL)
-        if m:
-            frontmatter = yaml.safe_load(m.group(1)) or {}
-            rest = content[m.end():]
-            return frontmatter, rest
-    except Exception as e:
-        print(f"Warning: Could not parse frontmatter in {filepath}: {e}")
-    return {}, None
-
-def _get_markdown_title(filepath):
-    frontmatter, markdown_content = _parse_frontmatter(filepath)
-    if isinstance(frontmatter, dict) and 'title' in frontmatter:
-        return str(frontmatter['title']).strip()
-    if not markdown_content:
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                markdown_content = f.read()
-        except Exception:
-            return None
-    for i, line in enumerate(markdown_content.splitlines()):
-        if i > 20:
-            break
-        m = re.match(r'^\s*#+\s*(.+)', line)
-        if m:
-            return m.group(1).strip()
-    return None
-
-def _get_weight(filepath):
-    frontmatter, _ = _parse_frontmatter(filepath)
-    w = frontmatter.get('weight', None)
-    try:
-        return int(w) if w is not None else None
-    except Exception:
-        return None
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = 'menu.pickle'
+CACHE_VERSION = 1
+MENU_TEMPLATE = 'menu.html'
+MENU_FRAGMENT = (
+    f'{{% from "{MENU_TEMPLATE}" import render_menu_item %}}'
+    '{% for item in items.values() %}{{ render_menu_item(item) }}{% endfor %}'
+)
+NAV_DIR = '_nav'
+# Rendered by the active_slot macro of menu.html on every link.
+ACTIVE_SLOT_REGEX = re.compile(r' data-active-slot="([^"]*)"')
+ACTIVE_ATTRIBUTES = ' class="sidebar-active" aria-current="page"'
 
-def _is_draft(filepath):
-    frontmatter, _ = _parse_frontmatter(filepath)
-    return bool(frontmatter.get('draft', False)) if isinstance(frontmatter, dict) else False
+# directory path -> (stamp, (index.md info, file entries))
+_CACHE = None
+_DIRTY = False
 
 def _sort_items(items):
     """Sort a list of menu entries by weight then title, return new list."""
@@ -58,57 +38,95 @@ def _sort_items(items):
 def _slugify(name):
     return name.lower().replace(' ', '-')
 
-def _build_menu_from_fs(current_fs_path, content_root_path):
-    menu_dict = {}
+def _scan_directory(current_fs_path, dir_mtime):
+    """List a directory once, returning its subdirectories, markdown files and
+    a stamp that changes whenever the directory or one of its files does."""
+    subdirs = []
+    files = []
+    try:
+        with os.scandir(current_fs_path) as it:
+            for entry in it:
+                if entry.is_dir():
+                    subdirs.append(entry)
+                elif entry.is_file() and entry.name.endswith('.md'):
+                    st = entry.stat()
+                    files.append((entry.name, st.st_mtime_ns, st.st_size))
+    except OSError:
+        return [], [], None
+    subdirs.sort(key=lambda e: e.name)
+    files.sort()
+    return subdirs, files, (dir_mtime, tuple(files))
 
-    if not os.path.isdir(current_fs_path):
-        return menu_dict
+def _directory_files(current_fs_path, rel_dir_slug, files, stamp):
+    """Menu entries of the markdown files of one directory, plus the metadata
+    of its index.md, reusing the cached result while ``stamp`` is unchanged."""
+    cache = _load_cache()
+    cached = cache.get(current_fs_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
 
-    items = os.listdir(current_fs_path)
+    index_info = None
     entries = []
+    for name, _, _ in files:
+        info = frontmatter.describe(os.path.join(current_fs_path, name))
+        if info is None:
+            continue
+        if name == 'index.md':
+            index_info = info
+            continue
+        if info['draft']:
+            continue
+        basename = os.path.splitext(name)[0]
+        entries.append({
+            'slug': basename,
+            'title': info['title'] or basename.replace('_', ' '),
+            'is_dir': False,
+            'link': f"{rel_dir_slug}/{basename}" if rel_dir_slug else basename,
+            'children': {},
+            'weight': info['weight'],
+        })
+    result = (index_info, entries)
+    cache[current_fs_path] = (stamp, result)
+    _mark_dirty()
+    return result
+
+def _build_directory(current_fs_path, content_root_path, dir_mtime, dirs):
+    """Return ``(index.md info, menu dict)`` for one directory, recording the
+    mtime of every directory walked in ``dirs``."""
+    dirs[current_fs_path] = dir_mtime
+    menu_dict = {}
 
-    for name in items:
-        full_path = os.path.join(current_fs_path, name)
-        rel_path_from_root = os.path.relpath(full_path, content_root_path)
-        rel_path_slug = rel_path_from_root.replace(os.sep, '/')
-
-        # Directory
-        if os.path.isdir(full_path):
-            index_path = os.path.join(full_path, 'index.md')
-            has_index = os.path.isfile(index_path) and not _is_draft(index_path)
-            children = _build_menu_from_fs(full_path, content_root_path)
-            # Directory node uses its index.md weight/title, or fallback
-            if has_index:
-                weight = _get_weight(index_path)
-                title = _get_markdown_title(index_path) or name.replace('_', ' ')
-                link = rel_path_slug
-            else:
-                weight = None
-                title = name.replace('_', ' ')
-                link = None
-            if has_index or children:
-                entries.append({
-                    'slug': name,  # keep original dir name as key
-                    'title': title,
-                    'is_dir': True,
-                    'link': link,
-                    'children': children,
-                    'weight': weight,
-                })
-        # File (not index.md)
-        elif os.path.isfile(full_path) and name.endswith('.md') and name != 'index.md':
-            if _is_draft(full_path):
-                continue
-            basename = os.path.splitext(name)[0]
-            rel_path_md_slug = re.sub(r'\.md$', '', rel_path_slug)
-            weight = _get_weight(full_path)
-            title = _get_markdown_title(full_path) or basename.replace('_', ' ')
+    subdirs, files, stamp = _scan_directory(current_fs_path, dir_mtime)
+    if stamp is None:
+        return None, menu_dict
+    rel_dir_slug = os.path.relpath(current_fs_path, content_root_path).replace(os.sep, '/')
+    if rel_dir_slug == '.':
+        rel_dir_slug = ''
+    own_index, file_entries = _directory_files(current_fs_path, rel_dir_slug, files, stamp)
+    entries = [dict(e) for e in file_entries]
+
+    for entry in subdirs:
+        name = entry.name
+        index_info, children = _build_directory(
+            entry.path, content_root_path, entry.stat().st_mtime_ns, dirs
+        )
+        has_index = index_info is not None and not index_info['draft']
+        # Directory node uses its index.md weight/title, or fallback
+        if has_index:
+            weight = index_info['weight']
+            title = index_info['title'] or name.replace('_', ' ')
+            link = f"{rel_dir_slug}/{name}" if rel_dir_slug else name
+        else:
+            weight = None
+            title = name.replace('_', ' ')
+            link = None
+        if has_index or children:
             entries.append({
-                'slug': basename,
+                'slug': name,  # keep original dir name as key
                 'title': title,
-                'is_dir': False,
-                'link': rel_path_md_slug,
-                'children': {},
+                'is_dir': True,
+                'link': link,
+                'children': children,
                 'weight': weight,
             })
 
@@ -119,11 +137,206 @@ def _build_menu_from_fs(current_fs_path, content_root_path):
         item.pop('weight', None)
         slug = item.pop('slug')
         menu_dict[slug] = item
-    return menu_dict
+    return own_index, menu_dict
+
+def _build_menu_from_fs(current_fs_path, content_root_path, dirs):
+    dir_mtime = _mtime(current_fs_path)
+    if dir_mtime is None:
+        return {}
+    return _build_directory(current_fs_path, content_root_path, dir_mtime, dirs)[1]
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _dirs_unchanged(dirs):
+    return bool(dirs) and all(_mtime(path) == mtime for path, mtime in dirs.items())
 
-def _get_menu_items(content_dir, inner_path):
-    content_path = os.path.join(content_dir, inner_path)
-    if not os.path.exists(content_path):
+def _load_cache():
+    global _CACHE
+    if _CACHE is None:
+        data = cache.load(CACHE_NAME, {})
+        _CACHE = data.get('entries', {}) if data.get('version') == CACHE_VERSION else {}
+    return _CACHE
+
+def _mark_dirty():
+    global _DIRTY
+    _DIRTY = True
+
+def _save_cache():
+    global _DIRTY
+    if not _DIRTY or _CACHE is None:
+        return
+    try:
+        cache.dump(CACHE_NAME, {'version': CACHE_VERSION, 'entries': _CACHE})
+        _DIRTY = False
+    except Exception as e:
+        logger.warning(f"[menu] Could not save menu cache: {e}")
+
+def _get_menu_items(content_dir, inner_path, dirs):
+    content_path = os.path.abspath(os.path.join(content_dir, inner_path))
+    if not os.path.isdir(content_path):
+        dirs[content_path] = None
         return {}
-    return _build_menu_from_fs(content_path, content_dir)
+    menu = _build_menu_from_fs(content_path, os.path.abspath(content_dir), dirs)
+    _save_cache()
+    frontmatter.save()
+    return menu
+
+def inject_menus(app, env, docnames):
+    """Build the sidebar menus into ``html_context``. A section with no
+    changed document and whose directories kept their mtimes reuses the menu
+    of the last build without walking the tree."""
+    context = app.config.html_context
+    trees = getattr(env, 'menu_trees', {})
+    stamps = getattr(env, 'menu_dirs', {})
+    env.menu_dirs = {}
+    for section in app.config.menu_sections:
+        prefix = f'{section}/'
+        dirs = stamps.get(section, {})
+        if (
+            section in trees
+            and _dirs_unchanged(dirs)
+            and not any(d.startswith(prefix) for d in docnames)
+        ):
+            context[f'{section}_menu'] = trees[section]
+        else:
+            dirs = {}
+            context[f'{section}_menu'] = _get_menu_items(app.srcdir, section, dirs)
+        env.menu_dirs[section] = dirs
+
+def prepare_menus(app, env, added, changed, removed):
+    """Menus are injected here, on every build and after the builder hashed
+    its config, so a changed menu does not invalidate the whole environment."""
+    inject_menus(app, env, added | changed | removed)
+    render_fragments(app)
+    return []
+
+def outdated_menu_docs(app, env):
+    """Rewrite the pages of the sections whose menu tree changed. The menu is
+    only added at html-page-context, so they need no re-reading."""
+    previous = getattr(env, 'menu_trees', {})
+    current = {
+        section: app.config.html_context.get(f'{section}_menu', {})
+        for section in app.config.menu_sections
+    }
+    env.menu_trees = current
+    outdated = set()
+    for section, tree in current.items():
+        if previous.get(section) != tree:
+            prefix = f'{section}/'
+            outdated.update(d for d in env.found_docs if d.startswith(prefix))
+    return sorted(outdated)
+
+def render_fragments(app):
+    """Render each section's menu through ``menu.html`` once per build; pages
+    only mark their own entry in the shared fragment (see add_menu_fragment).
+    With ``menu_manifest`` the full trees go to hashed JSON manifests instead
+    and pages render only their active branch."""
+    templates = getattr(app.builder, 'templates', None)
+    app.menu_fragments = {}
+    app.menu_manifests = {}
+    if templates is None or app.builder.format != 'html':
+        return
+    try:
+        templates.environment.get_template(MENU_TEMPLATE)
+    except TemplateNotFound:
+        logger.warning(f"[menu] {MENU_TEMPLATE} is not on templates_path, building without sidebar menus")
+        return
+    app.menu_template = templates.environment.from_string(MENU_FRAGMENT)
+    context = app.config.html_context
+    for section in app.config.menu_sections:
+        items = context.get(f'{section}_menu', {})
+        if app.config.menu_manifest:
+            data = json.dumps(_manifest_nodes(items), ensure_ascii=False, separators=(',', ':'))
+            digest = hashlib.sha256(data.encode('utf-8')).hexdigest()[:10]
+            app.menu_manifests[section] = (f'{section}.{digest}.json', data)
+        else:
+            app.menu_fragments[section] = app.menu_template.render(items=items)
+
+def _manifest_nodes(items):
+    """``[title, link]`` per item, plus its children as a third element."""
+    nodes = []
+    for item in items.values():
+        node = [item['title'], item.get('link')]
+        if item['children']:
+            node.append(_manifest_nodes(item['children']))
+        nodes.append(node)
+    return nodes
+
+def _active_branch(items, prefix, pagename):
+    """Copy of the menu keeping only the children of the ancestors of
+    ``pagename``; nav.js expands the rest from the manifest."""
+    branch = {}
+    for slug, item in items.items():
+        path = f'{prefix}/{slug}'
+        on_path = pagename == path or pagename.startswith(f'{path}/')
+        children = _active_branch(item['children'], path, pagename) if on_path else {}
+        branch[slug] = dict(item, children=children)
+    return branch
+
+def mark_active(fragment, pagename):
+    """Fill the ``active_slot`` of ``pagename``'s link in ``fragment`` and
+    drop the others."""
+    link = pagename[:-len('/index')] if pagename.endswith('/index') else pagename
+    key = str(escape(link))
+    marked = 0
+
+    def fill(match):
+        nonlocal marked
+        if match.group(1) != key or marked:
+            return ''
+        marked += 1
+        return ACTIVE_ATTRIBUTES
+
+    fragment = ACTIVE_SLOT_REGEX.sub(fill, fragment)
+    if not marked:
+        logger.debug(f"[menu] No menu entry for {pagename}")
+    return fragment
+
+def add_menu_fragment(app, pagename, templatename, context, doctree):
+    for section in app.config.menu_sections:
+        if not pagename.startswith(f'{section}/'):
+            continue
+        if section in getattr(app, 'menu_manifests', {}):
+            items = app.config.html_context.get(f'{section}_menu', {})
+            fragment = app.menu_template.render(items=_active_branch(items, section, pagename))
+            context['sidebar_manifest'] = f'/{NAV_DIR}/{app.menu_manifests[section][0]}'
+        elif section in getattr(app, 'menu_fragments', {}):
+            fragment = app.menu_fragments[section]
+        else:
+            return
+        context['sidebar_section'] = section
+        context['sidebar_menu'] = mark_active(fragment, pagename)
+        return
+
+def write_manifests(app, exception):
+    manifests = getattr(app, 'menu_manifests', {})
+    if exception is not None or not manifests:
+        return
+    nav_dir = os.path.join(app.outdir, NAV_DIR)
+    os.makedirs(nav_dir, exist_ok=True)
+    wanted = {filename for filename, _ in manifests.values()}
+    for filename, data in manifests.values():
+        target = os.path.join(nav_dir, filename)
+        if not os.path.exists(target):
+            with open(target, 'w', encoding='utf-8') as f:
+                f.write(data)
+    for name in os.listdir(nav_dir):
+        if name not in wanted:
+            os.remove(os.path.join(nav_dir, name))
 
+def setup(app):
+    app.add_config_value('menu_sections', ['libs', 'notes', 'glossary'], 'html')
+    app.add_config_value('menu_manifest', False, 'html')
+    app.connect('env-get-outdated', prepare_menus)
+    app.connect('env-updated', outdated_menu_docs)
+    app.connect('html-page-context', add_menu_fragment)
+    app.connect('build-finished', write_manifests)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,548 @@
+"""Post-build pipeline for the production site."""
+import argparse
+import fnmatch
+import gzip
+import hashlib
+import io
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from sphinx.util import logging
+from src.helper import cache
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+PRUNE_PATTERNS = [
+    '_sources',
+    'search*',
+    'objects.inv',
+    'genindex.html',
+    '_static/alabaster.css',
+    '_static/basic.css',
+    '_static/custom.css',
+    '_static/doc*',
+]
+
+MINIFY_SUFFIXES = ('.html', '.css')
+COMPRESS_SUFFIXES = ('.html', '.css', '.js', '.json', '.svg', '.webmanifest')
+STATIC_DIR = '_static'
+# Referenced by a fixed name from outside the generated HTML, or rewritten on
+# every build on purpose (see date.py): never fingerprinted.
+FINGERPRINT_EXCLUDE = ['buildstamp.js', 'site.webmanifest', 'favicon.ico', '*.map', '*.gz', '*.zst']
+FINGERPRINTED_REGEX = re.compile(r'\.[0-9a-f]{10}\.[^./]+$')
+STATIC_REF_REGEX = re.compile(r"""((?:href|src)=["'])((?:\.\./)*/?_static/)([^"'?#]+)""")
+SRCSET_REGEX = re.compile(r"""(srcset=["'])([^"']*)""")
+STATIC_PATH_REGEX = re.compile(r'((?:\.\./)*/?_static/)([^\s,"\'?#]+)')
+# Splits text files into the names they may refer to a static file by.
+REFERENCE_REGEX = re.compile(r'[^\s/"\'()<>,;=?#`]+')
+SIDECAR_SUFFIXES = ('.gz', '.zst')
+
+PRESERVE_REGEX = re.compile(
+    r'(<(pre|textarea|script|style|code)\b.*?</\2\s*>)', re.DOTALL | re.IGNORECASE
+)
+HTML_COMMENT_REGEX = re.compile(r'<!--(?!\[if).*?-->', re.DOTALL)
+WHITESPACE_REGEX = re.compile(r'\s+')
+CSS_STRING_REGEX = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+CSS_COMMENT_REGEX = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_PUNCT_REGEX = re.compile(r'\s*([{};,>])\s*')
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+IMAGE_WIDTHS = (320, 640, 960, 1280)
+IMAGE_CACHE_VERSION = 1
+# (Pillow format, MIME type, suffix, save options): the modern formats are
+# offered through <source> in this order, when the local Pillow can write them.
+IMAGE_FORMATS = [
+    ('AVIF', 'image/avif', '.avif', {'quality': 50}),
+    ('WEBP', 'image/webp', '.webp', {'quality': 80, 'method': 6}),
+]
+ORIGINAL_FORMATS = {
+    'JPEG': ('JPEG', 'image/jpeg', '.jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'PNG': ('PNG', 'image/png', '.png', {'optimize': True}),
+}
+IMG_TAG_REGEX = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+HTML_ATTR_REGEX = re.compile(r'''([^\s"'=<>/]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s"'=<>`]+))?''')
+
+def minify_html(text):
+    """Strip comments and collapse whitespace outside whitespace-sensitive tags."""
+    parts = PRESERVE_REGEX.split(text)
+    out = []
+    # split() yields: text, whole preserved block, tag name, text, ...
+    for i, part in enumerate(parts):
+        kind = i % 3
+        if kind == 0:
+            part = HTML_COMMENT_REGEX.sub('', part)
+            out.append(WHITESPACE_REGEX.sub(' ', part))
+        elif kind == 1:
+            out.append(part)
+    return ''.join(out).strip() + '\n'
+
+def minify_css(text):
+    text = CSS_COMMENT_REGEX.sub('', text)
+    parts = CSS_STRING_REGEX.split(text)
+    out = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            out.append(part)
+            continue
+        part = WHITESPACE_REGEX.sub(' ', part)
+        part = CSS_PUNCT_REGEX.sub(r'\1', part)
+        out.append(part.replace(';}', '}'))
+    return ''.join(out).strip() + '\n'
+
+def _minify_file(filepath):
+    with open(filepath, encoding='utf-8') as f:
+        text = f.read()
+    if filepath.endswith('.css'):
+        minified = minify_css(text)
+    else:
+        minified = minify_html(text)
+    before = len(text.encode('utf-8'))
+    after = len(minified.encode('utf-8'))
+    if after < before:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(minified)
+        return before, after
+    return before, before
+
+def _file_digest(filepath):
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _rewrite_static_refs(filepath, mapping):
+    with open(filepath, encoding='utf-8') as f:
+        text = f.read()
+
+    def _sub(m):
+        target = mapping.get(m.group(3))
+        return m.group(1) + m.group(2) + target if target else m.group(0)
+
+    def _sub_path(m):
+        target = mapping.get(m.group(2))
+        return m.group(1) + target if target else m.group(0)
+
+    rewritten = STATIC_REF_REGEX.sub(_sub, text)
+    rewritten = SRCSET_REGEX.sub(
+        lambda m: m.group(1) + STATIC_PATH_REGEX.sub(_sub_path, m.group(2)), rewritten
+    )
+    if rewritten != text:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(rewritten)
+
+def _referenced_names(filepath):
+    with open(filepath, encoding='utf-8', errors='replace') as f:
+        return set(REFERENCE_REGEX.findall(f.read()))
+
+def _cached_compress(filepath, suffix, compressor):
+    """Write ``filepath + suffix``, reusing the content-addressed copy in
+    ``.cache/compress`` when the file's hash was already compressed."""
+    cache_dir = cache.cache_path('compress')
+    cached = os.path.join(cache_dir, _file_digest(filepath) + suffix)
+    if not os.path.exists(cached):
+        with open(filepath, 'rb') as f:
+            data = compressor(f.read())
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, cached)
+    shutil.copyfile(cached, filepath + suffix)
+    return os.path.getsize(filepath + suffix)
+
+def _img_attrs(tag):
+    attrs = {}
+    for name, value in HTML_ATTR_REGEX.findall(tag[4:-1].rstrip('/')):
+        attrs[name.lower()] = value.strip('"\'')
+    return attrs
+
+def _local_image(htmlfile, src, outdir):
+    """Resolve the ``src`` of an ``<img>`` of ``htmlfile`` to an image of
+    ``outdir``, or None for remote and missing images."""
+    path = (src or '').split('?')[0].split('#')[0]
+    if not path or '//' in path or ':' in path.split('/')[0]:
+        return None
+    if path.startswith('/'):
+        path = os.path.join(outdir, path.lstrip('/'))
+    else:
+        path = os.path.join(os.path.dirname(htmlfile), path)
+    path = os.path.normpath(path)
+    if path.lower().endswith(IMAGE_SUFFIXES) and os.path.isfile(path):
+        return path
+    return None
+
+def _img_sources(htmlfile, outdir):
+    with open(htmlfile, encoding='utf-8') as f:
+        text = f.read()
+    found = []
+    for tag in IMG_TAG_REGEX.findall(text):
+        attrs = _img_attrs(tag)
+        path = None if 'srcset' in attrs else _local_image(htmlfile, attrs.get('src'), outdir)
+        if path:
+            found.append(path)
+    return found
+
+def _encode(image, fmt, options):
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+def _image_variants(filepath, widths, formats):
+    """Write the resized variants of ``filepath`` next to it, named after
+    the source hash so they never need fingerprinting. The encoded variants
+    are cached under ``.cache/images`` by the hash of the source and of the
+    settings, so unchanged images are never re-encoded."""
+    digest = _file_digest(filepath)
+    settings = repr((IMAGE_CACHE_VERSION, Image.__version__, widths, [f[0] for f in formats]))
+    key = hashlib.sha256(f'{digest}\0{settings}'.encode('utf-8')).hexdigest()
+    name = os.path.join('images', key[:2], key)
+    entry = cache.load(name)
+    if entry is None:
+        with Image.open(filepath) as image:
+            image.load()
+        width, height = image.size
+        own = ORIGINAL_FORMATS.get(image.format)
+        variants = []
+        for target in [w for w in widths if w < width] + [width]:
+            resized = image if target == width else image.resize(
+                (target, max(1, round(height * target / width))), Image.Resampling.LANCZOS
+            )
+            for fmt, mime, suffix, options in formats:
+                variants.append((mime, suffix, target, _encode(resized, fmt, options)))
+            if own and target < width:
+                fmt, mime, suffix, options = own
+                variants.append((mime, suffix, target, _encode(resized, fmt, options)))
+        entry = {'size': (width, height), 'mime': own and own[1], 'variants': variants}
+        cache.dump(name, entry)
+
+    directory, filename = os.path.split(filepath)
+    stem = re.sub(r'\.[0-9a-f]{10}$', '', os.path.splitext(filename)[0])
+    sources, own, best = {}, [], os.path.getsize(filepath)
+    for mime, suffix, target, data in entry['variants']:
+        variant = f'{stem}.{target}w.{digest[:10]}{suffix}'
+        target_path = os.path.join(directory, variant)
+        if not os.path.exists(target_path):
+            with open(target_path, 'wb') as f:
+                f.write(data)
+        if mime == entry['mime']:
+            own.append((variant, target))
+        else:
+            sources.setdefault(mime, []).append((variant, target))
+            if target == entry['size'][0]:
+                best = min(best, len(data))
+    return {
+        'size': entry['size'],
+        'sources': list(sources.items()),
+        'own': own,
+        'saved': os.path.getsize(filepath) - best,
+    }
+
+def _picture(tag, attrs, info):
+    """``tag`` with ``srcset``, ``width``/``height`` and lazy loading, wrapped
+    in a ``<picture>`` offering the modern formats."""
+    src = attrs['src']
+    base, _, filename = src.rpartition('/')
+    base = base + '/' if _ else ''
+    width, height = info['size']
+    shown = int(attrs['width']) if attrs.get('width', '').isdigit() else width
+    sizes = f'(max-width: {shown}px) 100vw, {shown}px'
+
+    def srcset(variants):
+        return ', '.join(f'{base}{name} {w}w' for name, w in variants)
+
+    extra = []
+    if 'width' not in attrs and 'height' not in attrs:
+        extra += [f'width="{width}"', f'height="{height}"']
+    elif shown != width and 'height' not in attrs:
+        extra.append(f'height="{round(height * shown / width)}"')
+    if 'loading' not in attrs:
+        extra.append('loading="lazy"')
+    if 'decoding' not in attrs:
+        extra.append('decoding="async"')
+    if info['own']:
+        extra += [f'srcset="{srcset(info["own"] + [(filename, width)])}"', f'sizes="{sizes}"']
+    img = f"{tag[:-1].rstrip('/').rstrip()} {' '.join(extra)}>"
+    sources = ''.join(
+        f'<source type="{mime}" srcset="{srcset(variants)}" sizes="{sizes}">'
+        for mime, variants in info['sources']
+    )
+    return f'<picture>{sources}{img}</picture>' if sources else img
+
+def _rewrite_img_tags(filepath, outdir, images):
+    with open(filepath, encoding='utf-8') as f:
+        text = f.read()
+    if '<img' not in text:
+        return
+
+    def _sub(m):
+        attrs = _img_attrs(m.group(0))
+        if 'srcset' in attrs:
+            return m.group(0)
+        info = images.get(_local_image(filepath, attrs.get('src'), outdir))
+        return _picture(m.group(0), attrs, info) if info else m.group(0)
+
+    rewritten = IMG_TAG_REGEX.sub(_sub, text)
+    if rewritten != text:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(rewritten)
+
+def _optimize_png(filepath):
+    """Losslessly recompress ``filepath`` in place when that makes it smaller,
+    caching the result by the hash of the source."""
+    name = os.path.join('images', 'png', _file_digest(filepath))
+    data = cache.load(name)
+    if data is None:
+        with Image.open(filepath) as image:
+            data = _encode(image, 'PNG', {'optimize': True, 'icc_profile': image.info.get('icc_profile')})
+        # Only the smaller results are kept; b'' records "already optimal".
+        if len(data) >= os.path.getsize(filepath):
+            data = b''
+        cache.dump(name, data)
+    if not data:
+        return 0
+    before = os.path.getsize(filepath)
+    with open(filepath, 'wb') as f:
+        f.write(data)
+    return before - len(data)
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def _zstd(data):
+    return zstandard.ZstdCompressor(level=19).compress(data)
+
+def _compress_file(filepath, use_zstd=False):
+    raw = os.path.getsize(filepath)
+    gz = _cached_compress(filepath, '.gz', _gzip)
+    if use_zstd:
+        _cached_compress(filepath, '.zst', _zstd)
+    return raw, gz
+
+def _iter_files(root, suffixes):
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.endswith(suffixes):
+                yield os.path.join(dirpath, name)
+
+def _parallel_map(func, items, workers):
+    if workers == 1 or len(items) < 2:
+        return [func(item) for item in items]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, items, chunksize=max(1, len(items) // (workers * 4))))
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+def _size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(f) for f in _iter_files(path, ''))
+    return os.path.getsize(path)
+
+def prune(outdir, patterns=PRUNE_PATTERNS, **_):
+    """Remove build artifacts the site does not serve; returns bytes freed."""
+    freed = 0
+    for pattern in patterns:
+        parent = os.path.join(outdir, os.path.dirname(pattern))
+        if not os.path.isdir(parent):
+            continue
+        for name in fnmatch.filter(os.listdir(parent), os.path.basename(pattern)):
+            path = os.path.join(parent, name)
+            freed += _size(path)
+            _remove(path)
+    return freed
+
+def minify(outdir, workers=None, **_):
+    """Minify every HTML and CSS file of ``outdir`` in a process pool."""
+    files = list(_iter_files(outdir, MINIFY_SUFFIXES))
+    results = _parallel_map(_minify_file, files, workers or os.cpu_count() or 1)
+    return sum(before - after for before, after in results)
+
+def fingerprint(outdir, workers=None, exclude=FINGERPRINT_EXCLUDE, **_):
+    """Copy every static asset to a content-hashed name and point the
+    generated HTML at it, so the assets can be cached forever.
+
+    Originals and hashed files (including older copies and image variants)
+    that no text file of ``outdir`` names any more are removed afterwards;
+    returns the bytes freed."""
+    static_dir = os.path.join(outdir, STATIC_DIR)
+    if not os.path.isdir(static_dir):
+        return 0
+    workers = workers or os.cpu_count() or 1
+    mapping = {}
+    hashed_files = []
+    for filepath in list(_iter_files(static_dir, '')):
+        rel = os.path.relpath(filepath, static_dir).replace(os.sep, '/')
+        name = os.path.basename(rel)
+        if FINGERPRINTED_REGEX.search(name):
+            hashed_files.append(rel)
+            continue
+        if any(fnmatch.fnmatch(name, p) for p in exclude):
+            continue
+        stem, ext = os.path.splitext(rel)
+        hashed = f"{stem}.{_file_digest(filepath)[:10]}{ext}"
+        shutil.copyfile(filepath, os.path.join(static_dir, hashed))
+        mapping[rel] = hashed
+    # Pages Sphinx did not rewrite since an earlier run still name older
+    # copies: point them at the current ones.
+    for rel in hashed_files:
+        original = FINGERPRINTED_REGEX.sub('', rel) + os.path.splitext(rel)[1]
+        if mapping.get(original, rel) != rel:
+            mapping[rel] = mapping[original]
+    html_files = list(_iter_files(outdir, ('.html',)))
+    _parallel_map(partial(_rewrite_static_refs, mapping=mapping), html_files, workers)
+
+    text_files = list(_iter_files(outdir, COMPRESS_SUFFIXES))
+    referenced = set().union(*_parallel_map(_referenced_names, text_files, workers))
+    # Copies made by this run only and removed again were never served.
+    created = set(mapping.values()) - set(hashed_files)
+    freed = 0
+    for rel in set(mapping) | set(mapping.values()) | set(hashed_files):
+        if os.path.basename(rel) in referenced:
+            continue
+        path = os.path.join(static_dir, rel)
+        for target in (path,) + tuple(path + suffix for suffix in SIDECAR_SUFFIXES):
+            if os.path.exists(target):
+                if rel not in created:
+                    freed += os.path.getsize(target)
+                os.remove(target)
+    return freed
+
+def precompress(outdir, workers=None, use_zstd=False, **_):
+    """Write ``.gz`` (and ``.zst`` when zstandard is installed) sidecars."""
+    if use_zstd and zstandard is None:
+        logger.warning("[postbuild] zstandard is not installed, skipping .zst sidecars")
+        use_zstd = False
+    files = list(_iter_files(outdir, COMPRESS_SUFFIXES))
+    results = _parallel_map(
+        partial(_compress_file, use_zstd=use_zstd), files, workers or os.cpu_count() or 1
+    )
+    return sum(raw - gz for raw, gz in results)
+
+def optimize_images(outdir, workers=None, widths=IMAGE_WIDTHS, **_):
+    """Give every local ``<img>`` resized variants (AVIF/WebP when Pillow
+    supports them) through ``srcset``, plus ``width``/``height`` and
+    ``loading="lazy"``, and losslessly recompress the PNGs (e.g. icons)."""
+    if Image is None:
+        logger.warning("[postbuild] Pillow is not installed, skipping images")
+        return 0
+    workers = workers or os.cpu_count() or 1
+    Image.init()
+    formats = [f for f in IMAGE_FORMATS if f[0] in Image.SAVE]
+    pngs = list(_iter_files(outdir, ('.png',)))
+    html_files = list(_iter_files(outdir, ('.html',)))
+    found = _parallel_map(partial(_img_sources, outdir=outdir), html_files, workers)
+    sources = sorted({path for paths in found for path in paths})
+    results = _parallel_map(
+        partial(_image_variants, widths=tuple(widths), formats=formats), sources, workers
+    )
+    images = dict(zip(sources, results))
+    if images:
+        _parallel_map(partial(_rewrite_img_tags, outdir=outdir, images=images), html_files, workers)
+    saved = sum(_parallel_map(_optimize_png, pngs, workers))
+    return saved + sum(info['saved'] for info in images.values())
+
+def flatten(builddir, **_):
+    """Move ``<builddir>/html/*`` up into ``<builddir>``."""
+    html_dir = os.path.join(builddir, 'html')
+    if not os.path.isdir(html_dir):
+        return 0
+    for name in os.listdir(html_dir):
+        target = os.path.join(builddir, name)
+        _remove(target)
+        shutil.move(os.path.join(html_dir, name), target)
+    os.rmdir(html_dir)
+    return 0
+
+def run_stages(stages, log=print):
+    """Run ``(name, func, args)`` stages in order and log timings and savings."""
+    report = []
+    for name, func, args in stages:
+        start = time.perf_counter()
+        saved = func(**args) or 0
+        elapsed = time.perf_counter() - start
+        report.append((name, elapsed, saved))
+        log(f"[postbuild] {name:<12} {elapsed * 1000:8.1f} ms  {saved / 1024:10.1f} KiB saved")
+    total_time = sum(r[1] for r in report)
+    total_saved = sum(r[2] for r in report)
+    log(f"[postbuild] {'total':<12} {total_time * 1000:8.1f} ms  {total_saved / 1024:10.1f} KiB saved")
+    return report
+
+def production_stages(outdir, workers=None, prune_patterns=PRUNE_PATTERNS, use_zstd=False,
+                      image_widths=IMAGE_WIDTHS):
+    # images runs before fingerprint, so the hashed names match the optimized
+    # files; its variants are content-named already and are left as they are.
+    return [
+        ('prune', prune, {'outdir': outdir, 'patterns': prune_patterns}),
+        ('minify', minify, {'outdir': outdir, 'workers': workers}),
+        ('images', optimize_images, {'outdir': outdir, 'workers': workers, 'widths': image_widths}),
+        ('fingerprint', fingerprint, {'outdir': outdir, 'workers': workers}),
+        ('precompress', precompress, {'outdir': outdir, 'workers': workers, 'use_zstd': use_zstd}),
+    ]
+
+def run_postbuild(app, exception):
+    if exception is not None or not app.config.postbuild_enabled:
+        return
+    if app.builder.format != 'html':
+        return
+    stages = production_stages(
+        str(app.outdir),
+        app.config.postbuild_workers,
+        app.config.postbuild_prune,
+        app.config.postbuild_zstd,
+        app.config.postbuild_image_widths,
+    )
+    run_stages(stages, log=logger.info)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('builddir', help='the Sphinx build directory, e.g. dist')
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('--zstd', action='store_true', help='also write .zst sidecars')
+    args = parser.parse_args(argv)
+
+    builddir = args.builddir
+    html_dir = os.path.join(builddir, 'html')
+    outdir = html_dir if os.path.isdir(html_dir) else builddir
+    stages = [('doctrees', prune, {'outdir': builddir, 'patterns': ['doctrees']})]
+    stages += production_stages(outdir, args.workers, use_zstd=args.zstd)
+    if outdir == html_dir:
+        stages.append(('flatten', flatten, {'builddir': builddir}))
+    run_stages(stages)
+    return 0
+
+def setup(app):
+    app.add_config_value('postbuild_enabled', False, '')
+    app.add_config_value('postbuild_workers', None, '')
+    app.add_config_value('postbuild_prune', PRUNE_PATTERNS, '')
+    app.add_config_value('postbuild_zstd', False, '')
+    app.add_config_value('postbuild_image_widths', IMAGE_WIDTHS, '')
+    app.connect('build-finished', run_postbuild)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
+
+if __name__ == '__main__':
+    sys.exit(main())
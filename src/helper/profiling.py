@@ -0,0 +1,206 @@
+"""Opt-in build profiler (-D profiling_enabled=1)."""
+import functools
+import json
+import os
+import shutil
+import time
+import tracemalloc
+from collections import defaultdict
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+RAW_DIR = 'raw'
+# Records gathered in this process and not yet flushed to its raw file.
+_RECORDS = []
+# Absolute memory peaks of the measurements in progress: transforms run inside
+# other measured steps (``DoctreeReadEvent`` runs the doctree-read handlers),
+# and the inner ``reset_peak`` would otherwise hide the outer step's peak.
+_PEAKS = []
+# Nesting depth of the measurements in progress, and the app whose flush was
+# requested from inside one (flushed when the outermost step returns).
+_STATE = {'depth': 0, 'pending': None}
+
+def _profile_dir(app):
+    if app.config.profiling_dir:
+        return os.path.abspath(app.config.profiling_dir)
+    return os.path.join(os.path.dirname(os.path.abspath(app.doctreedir)), 'profile')
+
+def _qualname(obj):
+    return f"{obj.__module__}.{getattr(obj, '__qualname__', obj.__class__.__name__)}"
+
+def _measure(kind, name, docname, func, *args, **kwargs):
+    memory = tracemalloc.is_tracing()
+    if memory:
+        base, peak = tracemalloc.get_traced_memory()
+        if _PEAKS:
+            _PEAKS[-1] = max(_PEAKS[-1], peak)
+        _PEAKS.append(base)
+        tracemalloc.reset_peak()
+    _STATE['depth'] += 1
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        _STATE['depth'] -= 1
+        peak = 0
+        if memory:
+            peak = max(tracemalloc.get_traced_memory()[1], _PEAKS.pop())
+            if _PEAKS:
+                _PEAKS[-1] = max(_PEAKS[-1], peak)
+            peak -= base
+        _RECORDS.append((kind, name, docname, os.getpid(), start, elapsed, peak))
+        if not _STATE['depth'] and _STATE['pending'] is not None:
+            flush(_STATE['pending'])
+
+def _wrap_handler(event, handler):
+    name = _qualname(handler)
+
+    @functools.wraps(handler)
+    def wrapper(app, *args):
+        docname = args[0] if args and isinstance(args[0], str) else app.env.docname
+        return _measure(event, name, docname or '', handler, app, *args)
+
+    return wrapper
+
+def _wrap_transform(kind, cls):
+    name = _qualname(cls)
+    apply = cls.apply
+
+    def profiled_apply(self, **kwargs):
+        env = getattr(self.document.settings, 'env', None)
+        docname = env.docname if env is not None else ''
+        return _measure(kind, name, docname or '', apply, self, **kwargs)
+
+    return type(cls.__name__, (cls,), {'apply': profiled_apply, '__module__': cls.__module__})
+
+def _raw_dir(app):
+    return os.path.join(_profile_dir(app), RAW_DIR)
+
+def flush(app, *args):
+    """Append this process' records to its own raw file. Called at the end
+    of every read and resolve, so forked workers leave nothing behind."""
+    if _STATE['depth']:
+        _STATE['pending'] = app
+        return
+    _STATE['pending'] = None
+    if not _RECORDS:
+        return
+    os.makedirs(_raw_dir(app), exist_ok=True)
+    with open(os.path.join(_raw_dir(app), f'{os.getpid()}.jsonl'), 'a', encoding='utf-8') as f:
+        for record in _RECORDS:
+            f.write(json.dumps(record) + '\n')
+    _RECORDS.clear()
+
+def instrument(app):
+    if not app.config.profiling_enabled:
+        return
+    raw = _raw_dir(app)
+    shutil.rmtree(raw, ignore_errors=True)
+    os.makedirs(raw)
+    if app.config.profiling_memory:
+        tracemalloc.start()
+
+    own = {flush, write_report}
+    for event in app.config.profiling_events:
+        listeners = app.events.listeners[event]
+        listeners[:] = [
+            l if l.handler in own else l._replace(handler=_wrap_handler(event, l.handler))
+            for l in listeners
+        ]
+    registry = app.registry
+    registry.transforms[:] = [_wrap_transform('transform', t) for t in registry.transforms]
+    registry.post_transforms[:] = [
+        _wrap_transform('post-transform', t) for t in registry.post_transforms
+    ]
+    logger.info(f"[profiling] Instrumented {len(registry.transforms)} transforms, "
+                f"{len(registry.post_transforms)} post-transforms")
+
+def _load_records(raw):
+    records = []
+    if not os.path.isdir(raw):
+        return records
+    for name in sorted(os.listdir(raw)):
+        with open(os.path.join(raw, name), encoding='utf-8') as f:
+            records.extend(json.loads(line) for line in f)
+    return records
+
+def summarize(records):
+    """Aggregate records per ``(kind, name)`` and per document, slowest first."""
+    by_step = defaultdict(lambda: {'calls': 0, 'total': 0.0, 'max': 0.0, 'peak': 0, 'slowest': ''})
+    by_doc = defaultdict(float)
+    for kind, name, docname, _, _, elapsed, peak in records:
+        step = by_step[(kind, name)]
+        step['calls'] += 1
+        step['total'] += elapsed
+        step['peak'] = max(step['peak'], peak)
+        if elapsed > step['max']:
+            step['max'] = elapsed
+            step['slowest'] = docname
+        by_doc[docname] += elapsed
+    steps = sorted(by_step.items(), key=lambda item: item[1]['total'], reverse=True)
+    docs = sorted(by_doc.items(), key=lambda item: item[1], reverse=True)
+    return steps, docs
+
+def format_report(steps, docs, top_docs=20):
+    lines = [f"{'total ms':>10} {'calls':>6} {'mean ms':>9} {'max ms':>9} {'peak KiB':>9}  "
+             f"{'kind':<15} name (slowest doc)"]
+    for (kind, name), s in steps:
+        lines.append(
+            f"{s['total'] * 1000:10.1f} {s['calls']:6d} {s['total'] / s['calls'] * 1000:9.2f} "
+            f"{s['max'] * 1000:9.2f} {s['peak'] / 1024:9.1f}  {kind:<15} {name} ({s['slowest']})"
+        )
+    lines += ['', f"{'total ms':>10}  document"]
+    lines += [f"{elapsed * 1000:10.1f}  {docname}" for docname, elapsed in docs[:top_docs]]
+    return '\n'.join(lines) + '\n'
+
+def chrome_trace(records):
+    """Complete ("X") events in the Chrome trace event format, one row per
+    process, with timestamps in microseconds from the first record."""
+    origin = min((r[4] for r in records), default=0)
+    events = []
+    for kind, name, docname, pid, start, elapsed, peak in records:
+        events.append({
+            'name': name.rsplit('.', 1)[-1],
+            'cat': kind,
+            'ph': 'X',
+            'ts': round((start - origin) * 1e6, 1),
+            'dur': round(elapsed * 1e6, 1),
+            'pid': pid,
+            'tid': pid,
+            'args': {'doc': docname, 'qualname': name, 'peak_bytes': peak},
+        })
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+def write_report(app, exception):
+    if not app.config.profiling_enabled:
+        return
+    flush(app)
+    outdir = _profile_dir(app)
+    raw = _raw_dir(app)
+    records = _load_records(raw)
+    shutil.rmtree(raw, ignore_errors=True)
+    steps, docs = summarize(records)
+    with open(os.path.join(outdir, 'profile.txt'), 'w', encoding='utf-8') as f:
+        f.write(format_report(steps, docs))
+    with open(os.path.join(outdir, 'trace.json'), 'w', encoding='utf-8') as f:
+        json.dump(chrome_trace(records), f)
+    for (kind, name), s in steps[:5]:
+        logger.info(f"[profiling] {s['total'] * 1000:8.1f} ms  {kind:<15} {name}")
+    logger.info(f"[profiling] {len(records)} records from {len(docs)} documents written to {outdir}")
+
+def setup(app):
+    app.add_config_value('profiling_enabled', False, '')
+    app.add_config_value('profiling_dir', '', '')
+    app.add_config_value('profiling_memory', True, '')
+    app.add_config_value('profiling_events', ['source-read', 'doctree-read'], '')
+    app.connect('builder-inited', instrument, priority=900)
+    app.connect('doctree-read', flush, priority=999)
+    app.connect('doctree-resolved', flush, priority=999)
+    app.connect('build-finished', write_report)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
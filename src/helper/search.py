@@ -0,0 +1,173 @@
+"""Compact static search index, split into prefix shards."""
+import json
+import os
+import re
+import unicodedata
+from docutils import nodes
+from sphinx.util import logging
+from src.helper import frontmatter
+
+logger = logging.getLogger(__name__)
+
+# docs.json holds the prefix length, stopwords and [url, title] of each doc;
+# <prefix>.json maps tokens to flat [doc, weight, ...] postings.
+SEARCH_DIR = '_search'
+TOKEN_REGEX = re.compile(r'[a-z0-9]+')
+SKIPPED_NODES = (
+    nodes.literal_block, nodes.comment, nodes.raw, nodes.docinfo,
+    nodes.system_message, nodes.substitution_definition,
+)
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have in is it its of on or '
+    'so that the this to was were which will with we you i e o de da do'.split()
+)
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return [t for t in TOKEN_REGEX.findall(text) if len(t) > 1 and t not in STOPWORDS]
+
+def _add(postings, text, weight):
+    for token in tokenize(text):
+        postings[token] = postings.get(token, 0) + weight
+
+def _add_text(postings, text, weight, term_pattern, term_weight):
+    """Index ``text``; autolink markup counts its term with ``term_weight``."""
+    if term_pattern is None:
+        _add(postings, text, weight)
+        return
+    last = 0
+    for match in term_pattern.finditer(text):
+        _add(postings, text[last:match.start()], weight)
+        _add(postings, match.group(2) or match.group(3) or '', max(weight, term_weight))
+        last = match.end()
+    _add(postings, text[last:], weight)
+
+def collect_postings(document, weights, term_pattern=None, title=None):
+    """``{token: weight}`` for ``document``; the first section title (or the
+    frontmatter ``title``) counts as the page title."""
+    postings = {}
+    if title:
+        _add(postings, title, weights['title'])
+    first_title = not title
+    stack = [(document, weights['body'])]
+    while stack:
+        node, weight = stack.pop()
+        for child in node.children:
+            if isinstance(child, nodes.Text):
+                _add_text(postings, child.astext(), weight, term_pattern, weights['term'])
+            elif isinstance(child, SKIPPED_NODES):
+                continue
+            elif isinstance(child, nodes.title):
+                heading = weights['title'] if first_title else weights['heading']
+                first_title = False
+                stack.append((child, heading))
+            else:
+                stack.append((child, weight))
+    return postings
+
+def _init_env(env):
+    if not hasattr(env, 'search_postings'):
+        env.search_postings = {}
+
+def index_doc(app, doctree):
+    env = app.env
+    _init_env(env)
+    index = getattr(app, 'autolink_index', None)
+    filepath = frontmatter.find_source(app.srcdir, env.docname)
+    title = frontmatter.get_title(filepath) if filepath else None
+    env.search_postings[env.docname] = collect_postings(
+        doctree,
+        app.config.search_weights,
+        index.pattern if index is not None else None,
+        title,
+    )
+
+def purge_postings(app, env, docname):
+    _init_env(env)
+    env.search_postings.pop(docname, None)
+
+def merge_postings(app, env, docnames, other):
+    _init_env(env)
+    for docname in docnames:
+        if docname in getattr(other, 'search_postings', {}):
+            env.search_postings[docname] = other.search_postings[docname]
+
+def _doc_title(env, docname):
+    title = env.metadata.get(docname, {}).get('title')
+    if not title and docname in env.titles:
+        title = env.titles[docname].astext()
+    if not title or title == '<no title>':
+        parts = docname.split('/')
+        title = parts[-2] if parts[-1] == 'index' and len(parts) > 1 else parts[-1]
+    return title
+
+def build_shards(postings_by_doc, prefix_length):
+    """Invert the postings into ``{prefix: {token: [doc, weight, ...]}}``;
+    each token's documents are sorted by decreasing weight."""
+    inverted = {}
+    for doc_id, postings in enumerate(postings_by_doc):
+        for token, weight in postings.items():
+            inverted.setdefault(token, []).append((weight, doc_id))
+    shards = {}
+    for token in sorted(inverted):
+        hits = sorted(inverted[token], key=lambda hit: (-hit[0], hit[1]))
+        flat = [value for weight, doc_id in hits for value in (doc_id, weight)]
+        shards.setdefault(token[:prefix_length], {})[token] = flat
+    return shards
+
+def _write_if_changed(filepath, content):
+    try:
+        with open(filepath, encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+def write_index(app, exception):
+    if exception is not None or app.builder.format != 'html':
+        return
+    env = app.env
+    _init_env(env)
+    docnames = sorted(d for d in env.search_postings if d in env.all_docs)
+    docs = [['/' + app.builder.get_target_uri(d), _doc_title(env, d)] for d in docnames]
+    shards = build_shards([env.search_postings[d] for d in docnames], app.config.search_prefix_length)
+
+    outdir = os.path.join(app.outdir, SEARCH_DIR)
+    os.makedirs(outdir, exist_ok=True)
+    wanted = {'docs.json'} | {f'{prefix}.json' for prefix in shards}
+    meta = {
+        'prefix': app.config.search_prefix_length,
+        'stopwords': sorted(STOPWORDS),
+        'docs': docs,
+    }
+    written = _write_if_changed(os.path.join(outdir, 'docs.json'), _dumps(meta))
+    for prefix, shard in shards.items():
+        written += _write_if_changed(os.path.join(outdir, f'{prefix}.json'), _dumps(shard))
+    for name in os.listdir(outdir):
+        if name not in wanted:
+            os.remove(os.path.join(outdir, name))
+    logger.info(
+        f"[search] {len(docs)} documents, {sum(len(s) for s in shards.values())} tokens "
+        f"in {len(shards)} shards ({written} written)"
+    )
+
+def setup(app):
+    app.setup_extension('src.helper.frontmatter')
+    app.add_config_value('search_prefix_length', 2, '')
+    app.add_config_value('search_weights', {'body': 1, 'term': 3, 'heading': 5, 'title': 10}, 'env')
+    app.connect('doctree-read', index_doc, priority=600)
+    app.connect('env-purge-doc', purge_postings)
+    app.connect('env-merge-info', merge_postings)
+    app.connect('build-finished', write_index)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -1,15 +1,29 @@
 from docutils import nodes
 from sphinx.transforms import SphinxTransform
 from sphinx.util import logging
+import hashlib
 import re
 
 logger = logging.getLogger(__name__)
 
+SEPARATOR_REGEX = re.compile(r'^[-=_]{4,}\s*$')
+# SEPARATOR_REGEX over a whole block; leading whitespace is allowed because
+# split_table_blocks strips the block before matching its first line.
+SEPARATOR_LINES_REGEX = re.compile(r'^[ \t]*[-=_]{4,}[ \t\r\f\v]*$', re.MULTILINE)
+COLUMN_REGEX = re.compile(r'(?:^| {2,})(\S)')
+
+def may_be_table(text):
+    """Cheap pre-filter: a table needs two separator lines, so a block with
+    fewer lines matching ``SEPARATOR_REGEX`` is skipped before any splitting
+    happens."""
+    lines = SEPARATOR_LINES_REGEX.finditer(text)
+    return next(lines, None) is not None and next(lines, None) is not None
+
 def split_table_blocks(text):
     lines = [l.rstrip('\r') for l in text.strip().splitlines()]
     if len(lines) < 4:
         return None
-    sep_indices = [i for i, l in enumerate(lines) if re.match(r'^[-=_]{4,}\s*$', l)]
+    sep_indices = [i for i, l in enumerate(lines) if SEPARATOR_REGEX.match(l)]
     if len(sep_indices) < 2:
         return None
     header_line = lines[0]
@@ -24,7 +38,7 @@ def split_table_blocks(text):
     return (header_line, content_lines, caption_line)
 
 def detect_column_boundaries(header_line):
-    matches = list(re.finditer(r'(?:^| {2,})(\S)', header_line))
+    matches = list(COLUMN_REGEX.finditer(header_line))
     starts = [m.start(1) for m in matches]
     boundaries = []
     for i in range(len(starts) - 1):
@@ -54,64 +68,127 @@ def find_label_for_literalblock(literal):
         return literal['ids'][0]
     return None
 
+def parse_txt_table(text):
+    """Parse a plain-text table into ``(header, rows, caption)`` or None.
+
+    Column boundaries are detected once from the header and reused as fixed
+    slices for every row.
+    """
+    if not may_be_table(text):
+        return None
+    result = split_table_blocks(text)
+    if not result:
+        return None
+    header_line, content_lines, caption_line = result
+
+    boundaries, starts = detect_column_boundaries(header_line)
+    if not starts:
+        return None
+    header = [h.strip() for h in parse_txt_table_line(header_line, boundaries, starts)]
+    num_columns = len(header)
+    slices = list(zip(starts, boundaries + [None]))
+    rows = []
+    for line in content_lines:
+        if not line.strip():
+            continue
+        fields = [line[start:end].strip() for start, end in slices]
+        rows.append((fields + [""] * num_columns)[:num_columns])
+    return header, rows, caption_line
+
+def table_digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def build_table_node(parsed, label):
+    header, rows, caption_line = parsed
+
+    table = nodes.table(classes=['custom-pre-table'])
+    tgroup = nodes.tgroup(cols=len(header))
+    table += tgroup
+
+    for _ in header:
+        tgroup += nodes.colspec(colwidth=1)
+
+    thead = nodes.thead()
+    tgroup += thead
+    row = nodes.row()
+    for h in header:
+        entry = nodes.entry()
+        entry += nodes.paragraph(text=h)
+        row += entry
+    thead += row
+
+    tbody = nodes.tbody()
+    tgroup += tbody
+
+    for fields in rows:
+        row = nodes.row()
+        for f in fields:
+            entry = nodes.entry()
+            entry += nodes.paragraph(text=f)
+            row += entry
+        tbody += row
+
+    wrapper = CaptionedTableDiv()
+    wrapper += table
+
+    if caption_line:
+        ref_uri = f"#{label}" if label else "#"
+        caption_para = nodes.paragraph()
+        caption_ref = nodes.reference('', caption_line, refuri=ref_uri, classes=['table-caption'])
+        caption_para += caption_ref
+        wrapper += caption_para
+    return wrapper
+
+def _init_env(env):
+    if not hasattr(env, 'txt_table_cache'):
+        env.txt_table_cache = {}
+        env.txt_table_docs = {}
+
 class TxtTableToNodeTransform(SphinxTransform):
     default_priority = 700
 
     def apply(self):
+        _init_env(self.env)
+        cache = self.env.txt_table_cache
+        used = set()
         for literal in list(self.document.traverse(nodes.literal_block)):
             text = literal.astext()
-            result = split_table_blocks(text)
-            if not result:
+            if not may_be_table(text):
+                continue
+            digest = table_digest(text)
+            used.add(digest)
+            if digest in cache:
+                parsed = cache[digest]
+            else:
+                parsed = cache[digest] = parse_txt_table(text)
+            if not parsed:
                 continue
-            header_line, content_lines, caption_line = result
 
             label = literal['ids'][0] if 'ids' in literal and len(literal['ids']) > 0 else None
-
-            content_lines = [l for l in content_lines if l.strip()]
-            boundaries, starts = detect_column_boundaries(header_line)
-            header_entries = parse_txt_table_line(header_line, boundaries, starts)
-            num_columns = len(header_entries)
-
-            table = nodes.table(classes=['custom-pre-table'])
-            tgroup = nodes.tgroup(cols=num_columns)
-            table += tgroup
-
-            for _ in header_entries:
-                tgroup += nodes.colspec(colwidth=1)
-
-            thead = nodes.thead()
-            tgroup += thead
-            row = nodes.row()
-            for h in header_entries:
-                entry = nodes.entry()
-                entry += nodes.paragraph(text=h.strip())
-                row += entry
-            thead += row
-
-            tbody = nodes.tbody()
-            tgroup += tbody
-
-            for line in content_lines:
-                fields = parse_txt_table_line(line, boundaries, starts)
-                fields = (fields + [""] * num_columns)[:num_columns]
-                row = nodes.row()
-                for f in fields:
-                    entry = nodes.entry()
-                    entry += nodes.paragraph(text=f.strip())
-                    row += entry
-                tbody += row
-
-            wrapper = CaptionedTableDiv()
-            wrapper += table
-
-            if caption_line:
-                ref_uri = f"#{label}" if label else "#"
-                caption_para = nodes.paragraph()
-                caption_ref = nodes.reference('', caption_line, refuri=ref_uri, classes=['table-caption'])
-                caption_para += caption_ref
-                wrapper += caption_para
-
-            literal.replace_self(wrapper)
+            literal.replace_self(build_table_node(parsed, label))
+        if used:
+            self.env.txt_table_docs[self.env.docname] = used
+
+def purge_tables(app, env, docname):
+    _init_env(env)
+    env.txt_table_docs.pop(docname, None)
+
+def merge_tables(app, env, docnames, other):
+    _init_env(env)
+    _init_env(other)
+    for docname in docnames:
+        if docname in other.txt_table_docs:
+            env.txt_table_docs[docname] = other.txt_table_docs[docname]
+            for digest in other.txt_table_docs[docname]:
+                if digest in other.txt_table_cache:
+                    env.txt_table_cache[digest] = other.txt_table_cache[digest]
+
+def prune_tables(app, env):
+    """Drop cached tables that no document contains anymore."""
+    _init_env(env)
+    used = set().union(*env.txt_table_docs.values()) if env.txt_table_docs else set()
+    for digest in [d for d in env.txt_table_cache if d not in used]:
+        del env.txt_table_cache[digest]
 
 def setup(app):
     app.add_node(
@@ -119,6 +196,9 @@ def setup(app):
         html=(visit_captioned_table_div_html, depart_captioned_table_div_html)
     )
     app.add_transform(TxtTableToNodeTransform)
+    app.connect('env-purge-doc', purge_tables)
+    app.connect('env-merge-info', merge_tables)
+    app.connect('env-updated', prune_tables)
     logger.info("[txt-table] Extension enabled: converting txt literal tables to real tables at doctree stage")
     return {
         'parallel_read_safe': True,
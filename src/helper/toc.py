@@ -1,75 +1,26 @@
-import re
 import os
+import posixpath
 from pathlib import Path
-import yaml
 from docutils import nodes
+from docutils.parsers.rst import directives
 from sphinx.transforms import SphinxTransform
 from sphinx.util.docutils import SphinxDirective
 from sphinx.util import logging
+from src.helper import frontmatter
 
 logger = logging.getLogger(__name__)
 
 
 def extract_frontmatter_weight(project_srcdir, docname, possible_suffixes):
-    for suffix in possible_suffixes:
-        candidate = Path(project_srcdir) / (docname + suffix)
-        if candidate.is_file():
-            with candidate.open("rt", encoding="utf-8") as f:
-                text = f.read()
-            if text.startswith('---'):
-                block_end = text.find('---', 3)
-                if block_end != -1:
-                    block = text[3:block_end].strip()
-                    match = re.search(r'^weight:\s*([\'"]?)([\d]+)\1$', block, re.MULTILINE)
-                    if match:
-                        try:
-                            return int(match.group(2))
-                        except Exception:
-                            return None
-    return None
-
-def extract_frontmatter_draft(project_srcdir, docname, possible_suffixes):
-    for suffix in possible_suffixes:
-        candidate = Path(project_srcdir) / (docname + suffix)
-        if candidate.is_file():
-            with candidate.open("rt", encoding="utf-8") as f:
-                text = f.read()
-            if text.startswith('---'):
-                block_end = text.find('---', 3)
-                if block_end != -1:
-                    block = text[3:block_end].strip()
-                    try:
-                        data = yaml.safe_load(block)
-                        if isinstance(data, dict):
-                            draft_val = data.get("draft")
-                            if isinstance(draft_val, bool):
-                                return draft_val
-                            if isinstance(draft_val, str):
-                                if draft_val.strip().lower() in ("true", "yes", "on", "1"):
-                                    return True
-                        return False
-                    except Exception:
-                        if re.search(r'^draft:\s*(true|True|yes|on|1)\s*$', block, re.MULTILINE):
-                            return True
-                        return False
-    return False
+    filepath = frontmatter.find_source(project_srcdir, docname, possible_suffixes)
+    return frontmatter.get_weight(filepath) if filepath else None
 
 def try_read_frontmatter_title(project_srcdir, docname, possible_suffixes):
-    logger = logging.getLogger(__name__)
-    for suffix in possible_suffixes:
-        candidate = Path(project_srcdir) / (docname + suffix)
-        if candidate.is_file():
-            with candidate.open("rt", encoding="utf-8") as f:
-                text = f.read()
-            if text.startswith('---'):
-                block_end = text.find('---', 3)
-                if block_end != -1:
-                    block = text[3:block_end].strip()
-                    match = re.search(r'^title:\s*[\'"]?(.+?)[\'"]?$', block, re.MULTILINE)
-                    if match:
-                        title = match.group(1).strip()
-                        return title
-    return None
+    filepath = frontmatter.find_source(project_srcdir, docname, possible_suffixes)
+    if not filepath:
+        return None
+    title = frontmatter.get_meta(filepath).get('title')
+    return str(title).strip() if title else None
 
 class toc_placeholder(nodes.General, nodes.Element):
     pass
@@ -85,12 +36,16 @@ class TocDirective(SphinxDirective):
     required_arguments = 0
     optional_arguments = 0
     final_argument_whitespace = False
+    option_spec = {
+        'depth': directives.positive_int,
+    }
 
     def run(self):
         node = toc_placeholder()
         source, line = self.state_machine.get_source_and_line(self.lineno)
         node.source = source
         node.line = line
+        node['depth'] = self.options.get('depth')
         return [node]
 
 class TocHorDirective(SphinxDirective):
@@ -98,12 +53,16 @@ class TocHorDirective(SphinxDirective):
     required_arguments = 0
     optional_arguments = 0
     final_argument_whitespace = False
+    option_spec = {
+        'depth': directives.positive_int,
+    }
 
     def run(self):
         node = toc_hor_placeholder()
         source, line = self.state_machine.get_source_and_line(self.lineno)
         node.source = source
         node.line = line
+        node['depth'] = self.options.get('depth')
         return [node]
 
 class TocDirDirective(SphinxDirective):
@@ -111,9 +70,122 @@ class TocDirDirective(SphinxDirective):
     required_arguments = 0
     optional_arguments = 0
     final_argument_whitespace = False
+    option_spec = {
+        'recursive': directives.flag,
+    }
 
     def run(self):
-        return [toc_dir_placeholder()]
+        node = toc_dir_placeholder()
+        node['recursive'] = 'recursive' in self.options
+        return [node]
+
+def extract_outline(document, doc_title):
+    """Return the sections of ``document`` as a flat list of dicts with
+    ``title``, ``id``, ``line`` and nesting ``depth`` (0 for top level)."""
+    outline = []
+    section_nodes = list(document.traverse(nodes.section))
+    if section_nodes:
+        for section in section_nodes:
+            title_node = section.next_node(nodes.title)
+            if not title_node:
+                continue
+
+            if (section.parent is document
+               and section is document.children[0]):
+                if title_node.astext().strip() == doc_title:
+                    continue
+
+            section_id = section.get('ids', [None])[0]
+            if not section_id:
+                continue
+
+            depth = 0
+            parent = section.parent
+            while parent is not None:
+                if isinstance(parent, nodes.section):
+                    depth += 1
+                parent = parent.parent
+
+            outline.append({
+                'title': title_node.astext(),
+                'id': section_id,
+                'line': getattr(title_node, 'line', None),
+                'depth': depth,
+            })
+    else:
+        for node in document.children:
+            if isinstance(node, nodes.title):
+                if node.astext().strip() == doc_title:
+                    continue
+
+                parent = node.parent
+                section_id = None
+                if parent and parent.get('ids'):
+                    section_id = parent['ids'][0]
+                elif node.get('ids'):
+                    section_id = node['ids'][0]
+                if not section_id:
+                    continue
+
+                outline.append({
+                    'title': node.astext(),
+                    'id': section_id,
+                    'line': getattr(node, 'line', None),
+                    'depth': 0,
+                })
+    return outline
+
+def get_outline(env, document):
+    """Extract the outline of the current document once and keep it on the env."""
+    outlines = getattr(env, 'toc_outlines', None)
+    if outlines is None:
+        outlines = env.toc_outlines = {}
+    docname = env.docname
+    if docname not in outlines:
+        doc_title_node = env.titles.get(docname)
+        doc_title = doc_title_node.astext().strip() if doc_title_node else ""
+        outlines[docname] = extract_outline(document, doc_title)
+    return outlines[docname]
+
+def outline_entries(outline, placeholder_node):
+    """Outline entries following the placeholder, limited to its ``depth``."""
+    placeholder_line = getattr(placeholder_node, 'line', None)
+    entries = []
+    for entry in outline:
+        if placeholder_line is not None and entry['line'] is not None:
+            if entry['line'] < placeholder_line:
+                continue
+        entries.append(entry)
+    depth = placeholder_node.get('depth')
+    if depth and entries:
+        base = min(e['depth'] for e in entries)
+        entries = [e for e in entries if e['depth'] - base < depth]
+    return entries
+
+def purge_outline(app, env, docname):
+    outlines = getattr(env, 'toc_outlines', None)
+    if outlines is not None:
+        outlines.pop(docname, None)
+
+def merge_outlines(app, env, docnames, other):
+    other_outlines = getattr(other, 'toc_outlines', {})
+    if not hasattr(env, 'toc_outlines'):
+        env.toc_outlines = {}
+    for docname in docnames:
+        if docname in other_outlines:
+            env.toc_outlines[docname] = other_outlines[docname]
+
+def _outline_ref(entry):
+    ref = nodes.reference('', '', internal=True, refid=entry['id'])
+    ref += nodes.Text(entry['title'])
+    return ref
+
+def _enumerated_list():
+    toc_container = nodes.enumerated_list()
+    toc_container['enumtype'] = 'arabic'
+    toc_container['prefix'] = ''
+    toc_container['suffix'] = '.'
+    return toc_container
 
 class TocTransform(SphinxTransform):
     default_priority = 100
@@ -123,82 +195,30 @@ class TocTransform(SphinxTransform):
             self.process_page_toc(node)
 
     def process_page_toc(self, placeholder_node):
-        toc_list_items = []
-        placeholder_line = getattr(placeholder_node, 'line', None)
-
-        section_nodes = list(self.document.traverse(nodes.section))
-        if section_nodes:
-            for section in section_nodes:
-                title_node = section.next_node(nodes.title)
-                if not title_node:
-                    continue
-
-                title_line = getattr(title_node, 'line', None)
-                if placeholder_line is not None and title_line is not None:
-                    if title_line < placeholder_line:
-                        continue
-
-                if (section.parent is self.document
-                   and section is self.document.children[0]):
-                    doc_title_node = self.env.titles.get(self.env.docname)
-                    doc_title = (doc_title_node.astext().strip()
-                                 if doc_title_node else "")
-                    if title_node.astext().strip() == doc_title:
-                        continue
-
-                title_text = title_node.astext()
-                section_id = section.get('ids', [None])[0]
-                if not section_id:
-                    continue
-
-                li = nodes.list_item()
-                p = nodes.paragraph()
-                ref = nodes.reference('', '', internal=True, refid=section_id)
-                ref += nodes.Text(title_text)
-                p += ref
-                li += p
-                toc_list_items.append(li)
-        else:
-            for node in self.document.children:
-                if isinstance(node, nodes.title):
-                    title_line = getattr(node, 'line', None)
-                    if placeholder_line is not None and title_line is not None:
-                        if title_line < placeholder_line:
-                            continue
-
-                    doc_title_node = self.env.titles.get(self.env.docname)
-                    doc_title = (doc_title_node.astext().strip() if doc_title_node else "")
-                    if node.astext().strip() == doc_title:
-                        continue
-
-                    title_text = node.astext()
-                    parent = node.parent
-                    section_id = None
-                    if parent and parent.get('ids'):
-                        section_id = parent['ids'][0]
-                    elif node.get('ids'):
-                        section_id = node['ids'][0]
-                    if not section_id:
-                        continue
-
-                    li = nodes.list_item()
-                    p = nodes.paragraph()
-                    ref = nodes.reference('', '', internal=True, refid=section_id)
-                    ref += nodes.Text(title_text)
-                    p += ref
-                    li += p
-                    toc_list_items.append(li)
-
-        if toc_list_items:
-            toc_container = nodes.enumerated_list()
-            toc_container['enumtype'] = 'arabic'
-            toc_container['prefix'] = ''
-            toc_container['suffix'] = '.'
-            for item in toc_list_items:
-                toc_container += item
-            placeholder_node.replace_self(toc_container)
-        else:
+        entries = outline_entries(get_outline(self.env, self.document), placeholder_node)
+        if not entries:
             placeholder_node.replace_self(nodes.paragraph())
+            return
+
+        nested = bool(placeholder_node.get('depth'))
+        base = min(e['depth'] for e in entries)
+        toc_container = _enumerated_list()
+        stack = [(0, toc_container)]
+        for entry in entries:
+            level = entry['depth'] - base if nested else 0
+            while len(stack) > 1 and stack[-1][0] > level:
+                stack.pop()
+            if level > stack[-1][0] and stack[-1][1].children:
+                sublist = _enumerated_list()
+                stack[-1][1].children[-1].append(sublist)
+                stack.append((level, sublist))
+
+            li = nodes.list_item()
+            p = nodes.paragraph()
+            p += _outline_ref(entry)
+            li += p
+            stack[-1][1].append(li)
+        placeholder_node.replace_self(toc_container)
 
 class TocHorTransform(SphinxTransform):
     default_priority = 100
@@ -208,74 +228,73 @@ class TocHorTransform(SphinxTransform):
             self.process_page_toc_hor(node)
 
     def process_page_toc_hor(self, placeholder_node):
-        toc_links = []
-        placeholder_line = getattr(placeholder_node, 'line', None)
-
-        section_nodes = list(self.document.traverse(nodes.section))
-        if section_nodes:
-            for section in section_nodes:
-                title_node = section.next_node(nodes.title)
-                if not title_node:
-                    continue
-
-                title_line = getattr(title_node, 'line', None)
-                if placeholder_line is not None and title_line is not None:
-                    if title_line < placeholder_line:
-                        continue
-
-                if (section.parent is self.document
-                   and section is self.document.children[0]):
-                    doc_title_node = self.env.titles.get(self.env.docname)
-                    doc_title = (doc_title_node.astext().strip()
-                                 if doc_title_node else "")
-                    if title_node.astext().strip() == doc_title:
-                        continue
-
-                title_text = title_node.astext()
-                section_id = section.get('ids', [None])[0]
-                if not section_id:
-                    continue
-
-                ref = nodes.reference('', '', internal=True, refid=section_id)
-                ref += nodes.Text(title_text)
-                toc_links.append(ref)
-        else:
-            for node in self.document.children:
-                if isinstance(node, nodes.title):
-                    title_line = getattr(node, 'line', None)
-                    if placeholder_line is not None and title_line is not None:
-                        if title_line < placeholder_line:
-                            continue
-
-                    doc_title_node = self.env.titles.get(self.env.docname)
-                    doc_title = (doc_title_node.astext().strip() if doc_title_node else "")
-                    if node.astext().strip() == doc_title:
-                        continue
-
-                    title_text = node.astext()
-                    parent = node.parent
-                    section_id = None
-                    if parent and parent.get('ids'):
-                        section_id = parent['ids'][0]
-                    elif node.get('ids'):
-                        section_id = node['ids'][0]
-                    if not section_id:
-                        continue
-
-                    ref = nodes.reference('', '', internal=True, refid=section_id)
-                    ref += nodes.Text(title_text)
-                    toc_links.append(ref)
-
-        if toc_links:
+        entries = outline_entries(get_outline(self.env, self.document), placeholder_node)
+        if entries:
             para = nodes.paragraph()
-            for idx, ref in enumerate(toc_links):
-                para += ref
-                if idx < len(toc_links) - 1:
+            for idx, entry in enumerate(entries):
+                para += _outline_ref(entry)
+                if idx < len(entries) - 1:
                     para += nodes.Text(" | ")
             placeholder_node.replace_self(para)
         else:
             placeholder_node.replace_self(nodes.paragraph())
 
+def _source_suffixes(cfg):
+    if hasattr(cfg, "source_suffix"):
+        if isinstance(cfg.source_suffix, dict):
+            return list(cfg.source_suffix)
+        if isinstance(cfg.source_suffix, (list, tuple)):
+            return list(cfg.source_suffix)
+        if isinstance(cfg.source_suffix, str):
+            return [cfg.source_suffix]
+    return [".md", ".rst"]
+
+def _dir_index_entry(app, docname, suffixes):
+    weight = extract_frontmatter_weight(app.srcdir, docname, suffixes)
+    return {
+        "weight": weight,
+        "title": try_read_frontmatter_title(app.srcdir, docname, suffixes),
+    }
+
+def _dir_index_add(index, docname, entry):
+    index["docs"][docname] = entry
+    directory = posixpath.dirname(docname)
+    index["dirs"].setdefault(directory, set()).add(docname)
+    while directory:
+        parent = posixpath.dirname(directory)
+        index["subdirs"].setdefault(parent, set()).add(directory)
+        directory = parent
+
+def _dir_index_remove(index, docname):
+    index["docs"].pop(docname, None)
+    directory = posixpath.dirname(docname)
+    siblings = index["dirs"].get(directory)
+    if siblings is None:
+        return
+    siblings.discard(docname)
+    while directory and not index["dirs"].get(directory) and not index["subdirs"].get(directory):
+        index["dirs"].pop(directory, None)
+        parent = posixpath.dirname(directory)
+        index["subdirs"].get(parent, set()).discard(directory)
+        directory = parent
+
+def update_dir_index(app, env, docnames):
+    """Keep ``env.toc_dir_index`` (directory -> child docs) in sync with found_docs.
+
+    Runs once per build before reading; only added, changed and removed
+    documents are touched.
+    """
+    index = getattr(env, "toc_dir_index", None)
+    if index is None:
+        index = env.toc_dir_index = {"docs": {}, "dirs": {}, "subdirs": {}}
+    for docname in [d for d in index["docs"] if d not in env.found_docs]:
+        _dir_index_remove(index, docname)
+    suffixes = _source_suffixes(env.config)
+    stale = set(docnames) | (env.found_docs - index["docs"].keys())
+    for docname in stale:
+        _dir_index_remove(index, docname)
+        _dir_index_add(index, docname, _dir_index_entry(app, docname, suffixes))
+
 class TocDirTransform(SphinxTransform):
     default_priority = 100
 
@@ -283,96 +302,79 @@ class TocDirTransform(SphinxTransform):
         for node in self.document.traverse(toc_dir_placeholder):
             self.process_directory_toc(node)
 
-    def process_directory_toc(self, placeholder_node):
-        logger = logging.getLogger(__name__)
-
-        docname = self.env.docname
-        current_doc_path_source = Path(self.env.doc2path(docname))
-        if not current_doc_path_source.is_absolute():
-            current_doc_path_source = Path(self.app.srcdir) / current_doc_path_source
-        current_dir_source = current_doc_path_source.parent
-
-        toc_list_items = []
-        all_docnames = sorted(self.env.found_docs)
-        current_doc_output_path = Path(self.app.builder.get_outfilename(docname))
-
-        sibling_docnames = []
-        for other in all_docnames:
-            p = Path(self.env.doc2path(other))
-            if not p.is_absolute():
-                p = Path(self.app.srcdir) / p
-            if (p.parent == current_dir_source
-               and other != docname
-               and Path(other).stem != "index"):
-                sibling_docnames.append(other)
-
-        cfg = self.env.config
-        if hasattr(cfg, "source_suffix"):
-            if isinstance(cfg.source_suffix, dict):
-                suffixes = list(cfg.source_suffix)
-            elif isinstance(cfg.source_suffix, (list, tuple)):
-                suffixes = list(cfg.source_suffix)
-            elif isinstance(cfg.source_suffix, str):
-                suffixes = [cfg.source_suffix]
-            else:
-                suffixes = [".md", ".rst"]
-        else:
-            suffixes = [".md", ".rst"]
+    def _dir_index(self):
+        index = getattr(self.env, "toc_dir_index", None)
+        if index is None:
+            update_dir_index(self.app, self.env, ())
+            index = self.env.toc_dir_index
+        return index
+
+    def _link_text(self, docname, entry):
+        link_text = entry["title"]
+        if not link_text:
+            tn = self.env.titles.get(docname)
+            if tn:
+                txt = tn.astext().strip()
+                if txt and txt != "<no title>":
+                    link_text = txt.replace("<no title>", "").strip()
+        if not link_text:
+            stem = Path(docname).stem
+            if stem == "index" and posixpath.dirname(docname):
+                stem = posixpath.basename(posixpath.dirname(docname))
+            link_text = " ".join(w.capitalize() for w in stem.replace("-", " ").replace("_", " ").split())
+        return link_text
+
+    def _relative_uri(self, current_doc_output_path, other):
+        other_out = Path(self.app.builder.get_outfilename(other))
+        try:
+            return other_out.relative_to(current_doc_output_path.parent).as_posix()
+        except Exception:
+            logger.warning(
+                f"Could not compute relative URI between "
+                f"{current_doc_output_path} and {other_out}.",
+                type="toc_generator",
+            )
+            return other_out.name
 
+    def _collect_entries(self, index, directory, exclude, current_doc_output_path, recursive):
         toc_entries = []
-        for other in sibling_docnames:
-            meta = self.env.metadata.get(other, {})
-            is_draft = False
-            if "draft" in meta:
-                d = meta["draft"]
-                if d is True or (isinstance(d, str) and d.strip().lower() in ("true", "yes", "on", "1")):
-                    is_draft = True
-            else:
-                is_draft = extract_frontmatter_draft(self.app.srcdir, other, suffixes)
-            if is_draft:
+        for other in index["dirs"].get(directory, ()):
+            if other == exclude or posixpath.basename(other) == "index":
                 continue
-
-            weight = None
-            if "weight" in meta:
-                try:
-                    weight = int(str(meta["weight"]))
-                except Exception:
-                    weight = None
-            if weight is None:
-                weight = extract_frontmatter_weight(self.app.srcdir, other, suffixes)
-
-            link_text = meta.get("title")
-            if not link_text:
-                link_text = try_read_frontmatter_title(self.app.srcdir, other, suffixes)
-            if not link_text:
-                tn = self.env.titles.get(other)
-                if tn:
-                    txt = tn.astext().strip()
-                    if txt and txt != "<no title>":
-                        link_text = txt.replace("<no title>", "").strip()
-            if not link_text:
-                stem = Path(other).stem
-                link_text = " ".join(w.capitalize() for w in stem.replace("-", " ").replace("_", " ").split())
-
-            other_out = Path(self.app.builder.get_outfilename(other))
-            try:
-                rel = other_out.relative_to(current_doc_output_path.parent).as_posix()
-            except Exception:
-                logger.warning(
-                    f"Could not compute relative URI between "
-                    f"{current_doc_output_path} and {other_out}.",
-                    type="toc_generator",
-                )
-                rel = other_out.name
-
+            entry = index["docs"][other]
             toc_entries.append({
                 "docname": other,
-                "weight": weight,
-                "link_text": link_text,
-                "relative_uri": rel,
+                "weight": entry["weight"],
+                "link_text": self._link_text(other, entry),
+                "relative_uri": self._relative_uri(current_doc_output_path, other),
+                "children": [],
             })
 
-        ordered = sorted(
+        if recursive:
+            for subdir in index["subdirs"].get(directory, ()):
+                children = self._collect_entries(
+                    index, subdir, exclude, current_doc_output_path, recursive
+                )
+                subdir_index = posixpath.join(subdir, "index")
+                entry = index["docs"].get(subdir_index)
+                if entry is not None:
+                    toc_entries.append({
+                        "docname": subdir_index,
+                        "weight": entry["weight"],
+                        "link_text": self._link_text(subdir_index, entry),
+                        "relative_uri": self._relative_uri(current_doc_output_path, subdir_index),
+                        "children": children,
+                    })
+                elif children:
+                    toc_entries.append({
+                        "docname": None,
+                        "weight": None,
+                        "link_text": posixpath.basename(subdir).replace("_", " "),
+                        "relative_uri": None,
+                        "children": children,
+                    })
+
+        return sorted(
             toc_entries,
             key=lambda e: (
                 e["weight"] is None,
@@ -380,44 +382,66 @@ class TocDirTransform(SphinxTransform):
                 e["link_text"].lower(),
             ),
         )
+
+    def _render_entries(self, ordered):
+        toc_container = nodes.enumerated_list()
+        toc_container["enumtype"] = "arabic"
+        toc_container["prefix"] = ""
+        toc_container["suffix"] = "."
         for entry in ordered:
             li = nodes.list_item()
             p = nodes.paragraph()
-            ref = nodes.reference(
-                "",
-                "",
-                internal=True,
-                refuri=entry["relative_uri"],
-                name=entry["link_text"],
-            )
-            ref += nodes.Text(entry["link_text"])
-            p += ref
+            if entry["relative_uri"] is not None:
+                ref = nodes.reference(
+                    "",
+                    "",
+                    internal=True,
+                    refuri=entry["relative_uri"],
+                    name=entry["link_text"],
+                )
+                ref += nodes.Text(entry["link_text"])
+                p += ref
+            else:
+                p += nodes.Text(entry["link_text"])
             li += p
-            toc_list_items.append(li)
+            if entry["children"]:
+                li += self._render_entries(entry["children"])
+            toc_container += li
             logger.info(
                 f"[toc-dir] Added '{entry['docname']}' "
                 f"(text={entry['link_text']}, uri={entry['relative_uri']}, "
                 f"weight={entry['weight']})"
             )
+        return toc_container
+
+    def process_directory_toc(self, placeholder_node):
+        docname = self.env.docname
+        current_doc_output_path = Path(self.app.builder.get_outfilename(docname))
+
+        ordered = self._collect_entries(
+            self._dir_index(),
+            posixpath.dirname(docname),
+            docname,
+            current_doc_output_path,
+            placeholder_node.get("recursive", False),
+        )
 
-        if toc_list_items:
-            toc_container = nodes.enumerated_list()
-            toc_container["enumtype"] = "arabic"
-            toc_container["prefix"] = ""
-            toc_container["suffix"] = "."
-            for li in toc_list_items:
-                toc_container += li
-            placeholder_node.replace_self(toc_container)
+        if ordered:
+            placeholder_node.replace_self(self._render_entries(ordered))
         else:
             placeholder_node.replace_self(nodes.paragraph())
 
 def setup(app):
+    app.setup_extension('src.helper.frontmatter')
     app.add_directive('toc', TocDirective)
     app.add_directive('toc-hor', TocHorDirective)
     app.add_directive('toc-dir', TocDirDirective)
     app.add_transform(TocTransform)
     app.add_transform(TocHorTransform)
     app.add_transform(TocDirTransform)
+    app.connect('env-before-read-docs', update_dir_index)
+    app.connect('env-purge-doc', purge_outline)
+    app.connect('env-merge-info', merge_outlines)
     logger.info("Initialized toc_generator extension.")
 
     try:
@@ -430,7 +454,7 @@ def setup(app):
         pass
 
     return {
-        'version': '0.12',
+        'version': '0.15',
         'parallel_read_safe': True,
         'parallel_write_safe': True,
     }
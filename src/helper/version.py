@@ -1,5 +1,6 @@
 import re
 from sphinx.util import logging
+from src.helper import frontmatter
 
 logger = logging.getLogger(__name__)
 
@@ -9,6 +10,11 @@ FRONTMATTER_REGEX = re.compile(
 VERSION_FIELD_REGEX = re.compile(r"^\s*version:\s*(.+?)\s*$", re.MULTILINE)
 
 def _process_version(app, docname, source):
+    filepath = frontmatter.find_source(app.srcdir, docname)
+    if filepath and 'version' not in frontmatter.get_meta(filepath):
+        logger.debug(f'No "version" field found in frontmatter for {docname}')
+        return
+
     content = source[0]
 
     front_match = FRONTMATTER_REGEX.match(content)
@@ -30,9 +36,10 @@ def _process_version(app, docname, source):
         logger.debug(f'No "version" field found in frontmatter for {docname}')
 
 def setup(app):
+    app.setup_extension('src.helper.frontmatter')
     app.connect('source-read', _process_version)
     return {
-        'version': '0.1',
+        'version': '0.2',
         'parallel_read_safe': True,
         'parallel_write_safe': True,
     }
@@ -0,0 +1,77 @@
+// Expands the sidebar from the navigation manifest of menu.py
+// (menu_manifest = True): pages only ship the branch of the current page.
+// The markup mirrors render_menu_item in templates/menu.html.
+(function() {
+  function escapeHTML(text) {
+    return String(text).replace(/[&<>"]/g, function(c) {
+      return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c];
+    });
+  }
+
+  function label(node, active) {
+    if (!node[1]) {
+      return '<span>' + escapeHTML(node[0]) + '</span>';
+    }
+    var href = '/' + node[1];
+    var current = href === active ? ' class="sidebar-active" aria-current="page"' : '';
+    return '<a href="' + escapeHTML(href) + '"' + current + '>' + escapeHTML(node[0]) + '</a>';
+  }
+
+  function renderChildren(children, level, parentBranch, active) {
+    return children.map(function(child, i) {
+      return renderItem(child, active, level, i === children.length - 1, parentBranch);
+    }).join('');
+  }
+
+  function renderItem(node, active, level, isLast, parentBranch) {
+    level = level || 0;
+    parentBranch = parentBranch || '';
+    var branch = parentBranch;
+    if (level > 1) {
+      branch += isLast ? '&nbsp;&nbsp;└─' : '&nbsp;&nbsp;├─';
+    } else if (level > 0) {
+      branch += isLast ? '└─' : '├─';
+    }
+    var children = node[2] || [];
+    if (level === 0 && children.length) {
+      return '<li class="sidebar-collapsible"><details open><summary><span>' + branch +
+        '</span>' + label(node, active) + '</summary><ul class="sidebar-ul-inner-1">' +
+        renderChildren(children, 1, parentBranch, active) + '</ul></details></li>';
+    }
+    if (level === 0) {
+      return '<li class="sidebar-li-0"><span>' + branch + '</span>' + label(node, active) + '</li>';
+    }
+    var prefix = level === 1 ? 'sidebar-prefix-1' : 'sidebar-prefix';
+    var html = '<li class="sidebar-li"><span class="' + prefix + '">' + branch + '</span>' +
+      label(node, active);
+    if (children.length) {
+      var nested = parentBranch + (isLast ? '    ' : (level === 1 ? '&nbsp;│   ' : '│ '));
+      html += '<ul class="sidebar-ul-inner">' + renderChildren(children, level + 1, nested, active) + '</ul>';
+    }
+    return html + '</li>';
+  }
+
+  document.addEventListener('DOMContentLoaded', function() {
+    var list = document.querySelector('.sidebar-ul[data-nav]');
+    if (!list) {
+      return;
+    }
+    var current = list.querySelector('.sidebar-active');
+    var active = current ? current.getAttribute('href') : null;
+    fetch(list.getAttribute('data-nav')).then(function(response) {
+      return response.ok ? response.json() : null;
+    }).then(function(nodes) {
+      if (!nodes) {
+        return;
+      }
+      list.innerHTML = nodes.map(function(node) {
+        return renderItem(node, active);
+      }).join('');
+      if (window.matchMedia('(max-width: 768px)').matches) {
+        list.querySelectorAll('.sidebar-collapsible > details[open]').forEach(function(details) {
+          details.removeAttribute('open');
+        });
+      }
+    });
+  });
+})();
@@ -0,0 +1,117 @@
+(function() {
+  var ROOT = '/_search/';
+  var MAX_RESULTS = 10;
+  var meta = null;
+  var shards = {};
+
+  function fetchJSON(url) {
+    return fetch(url).then(function(response) {
+      return response.ok ? response.json() : {};
+    });
+  }
+
+  function loadMeta() {
+    if (!meta) {
+      meta = fetchJSON(ROOT + 'docs.json');
+    }
+    return meta;
+  }
+
+  function loadShard(prefix) {
+    if (!(prefix in shards)) {
+      shards[prefix] = fetchJSON(ROOT + encodeURIComponent(prefix) + '.json');
+    }
+    return shards[prefix];
+  }
+
+  function tokenize(query) {
+    return query.toLowerCase().normalize('NFKD').replace(/[\u0300-\u036f]/g, '')
+      .match(/[a-z0-9]+/g) || [];
+  }
+
+  // Scores of every document matching one word, as a prefix of indexed tokens.
+  function scoreWord(word, prefixLength) {
+    return loadShard(word.slice(0, prefixLength)).then(function(shard) {
+      var scores = {};
+      Object.keys(shard).forEach(function(token) {
+        if (token.lastIndexOf(word, 0) !== 0) {
+          return;
+        }
+        var postings = shard[token];
+        var exact = token === word ? 2 : 1;
+        for (var i = 0; i < postings.length; i += 2) {
+          scores[postings[i]] = (scores[postings[i]] || 0) + postings[i + 1] * exact;
+        }
+      });
+      return scores;
+    });
+  }
+
+  function search(query) {
+    return loadMeta().then(function(data) {
+      // Stopwords have no postings: keeping them would empty the intersection.
+      var stopwords = data.stopwords || [];
+      var words = tokenize(query).filter(function(word) {
+        return word.length >= data.prefix && stopwords.indexOf(word) === -1;
+      });
+      if (!words.length) {
+        return [];
+      }
+      return Promise.all(words.map(function(word) {
+        return scoreWord(word, data.prefix);
+      })).then(function(perWord) {
+        // Only the documents matching every word are kept.
+        var total = perWord[0];
+        perWord.slice(1).forEach(function(scores) {
+          Object.keys(total).forEach(function(doc) {
+            if (doc in scores) {
+              total[doc] += scores[doc];
+            } else {
+              delete total[doc];
+            }
+          });
+        });
+        return Object.keys(total)
+          .sort(function(a, b) { return total[b] - total[a]; })
+          .slice(0, MAX_RESULTS)
+          .map(function(doc) { return data.docs[doc]; });
+      });
+    });
+  }
+
+  function render(list, results) {
+    list.innerHTML = '';
+    results.forEach(function(doc) {
+      var item = document.createElement('li');
+      var link = document.createElement('a');
+      link.href = doc[0];
+      link.textContent = doc[1];
+      item.appendChild(link);
+      list.appendChild(item);
+    });
+    list.hidden = !results.length;
+  }
+
+  document.addEventListener('DOMContentLoaded', function() {
+    var input = document.getElementById('search-input');
+    var list = document.getElementById('search-results');
+    if (!input || !list) {
+      return;
+    }
+    var pending = 0;
+    input.addEventListener('input', function() {
+      var current = ++pending;
+      search(input.value).then(function(results) {
+        if (current === pending) {
+          render(list, results);
+        }
+      });
+    });
+    input.addEventListener('keydown', function(event) {
+      if (event.key === 'Escape') {
+        input.value = '';
+        render(list, []);
+      }
+    });
+  });
+})();
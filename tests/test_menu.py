@@ -0,0 +1,39 @@
+import os
+from jinja2 import Environment, FileSystemLoader
+from src.helper import menu
+
+TEMPLATES = os.path.join(os.path.dirname(__file__), '..', 'src', 'templates')
+ACTIVE = 'class="sidebar-active" aria-current="page"'
+
+def item(title, link, **children):
+    return {'title': title, 'is_dir': bool(children), 'link': link, 'children': children}
+
+ITEMS = {
+    'comp': item('comp', 'libs/comp', overview=item('Overview', 'libs/comp/overview')),
+    'typed': item('typed', None, types=item('Types', 'libs/typed/types')),
+    'about': item('About', 'libs/about'),
+}
+
+def fragment():
+    environment = Environment(loader=FileSystemLoader(TEMPLATES))
+    return environment.from_string(menu.MENU_FRAGMENT).render(items=ITEMS)
+
+def test_marks_the_link_of_the_page():
+    html = menu.mark_active(fragment(), 'libs/comp/overview')
+    assert html.count(ACTIVE) == 1
+    assert f'<a href="/libs/comp/overview" {ACTIVE}>' in html
+    assert 'data-active-slot' not in html
+
+def test_index_pages_mark_their_directory():
+    html = menu.mark_active(fragment(), 'libs/comp/index')
+    assert html.count(ACTIVE) == 1
+    assert f'<a href="/libs/comp" {ACTIVE}>' in html
+
+def test_every_link_can_be_marked():
+    for link in ('libs/comp', 'libs/comp/overview', 'libs/typed/types', 'libs/about'):
+        assert f'<a href="/{link}" {ACTIVE}>' in menu.mark_active(fragment(), link)
+
+def test_unlisted_pages_mark_nothing():
+    html = menu.mark_active(fragment(), 'libs/missing')
+    assert ACTIVE not in html
+    assert 'data-active-slot' not in html
@@ -0,0 +1,72 @@
+import json
+import os
+import shutil
+import subprocess
+import pytest
+
+SEARCH_JS = os.path.join(os.path.dirname(__file__), '..', 'src', 'static', 'search.js')
+
+# Loads search.js with a stubbed DOM and fetch, types the query and prints
+# the hrefs of the rendered results.
+HARNESS = r'''
+const fs = require('fs');
+const path = require('path');
+const [script, root, query] = process.argv.slice(2);
+global.fetch = url => {
+  const file = path.join(root, decodeURIComponent(url));
+  const ok = fs.existsSync(file);
+  return Promise.resolve({ok, json: () => Promise.resolve(ok ? JSON.parse(fs.readFileSync(file, 'utf8')) : {})});
+};
+let ready;
+let results = [];
+const input = {value: '', listeners: {}, addEventListener(event, f) { this.listeners[event] = f; }};
+const list = {
+  hidden: true,
+  set innerHTML(value) { results = []; },
+  appendChild(item) { results.push(item.children[0].href); },
+};
+global.window = {};
+global.document = {
+  addEventListener(event, f) { ready = f; },
+  getElementById(id) { return id === 'search-input' ? input : list; },
+  createElement(tag) { return {children: [], appendChild(child) { this.children.push(child); }}; },
+};
+require(path.resolve(script));
+ready();
+input.value = query;
+input.listeners.input();
+setTimeout(() => console.log(JSON.stringify(results)), 50);
+'''
+
+def search(tmp_path, query):
+    if shutil.which('node') is None:
+        pytest.skip('node is not installed')
+    harness = tmp_path / 'harness.js'
+    harness.write_text(HARNESS)
+    out = subprocess.run(
+        ['node', str(harness), os.path.abspath(SEARCH_JS), str(tmp_path), query],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout)
+
+@pytest.fixture
+def index(tmp_path):
+    search_dir = tmp_path / '_search'
+    search_dir.mkdir()
+    docs = {'prefix': 2, 'stopwords': ['the'], 'docs': [['/a', 'A'], ['/b', 'B'], ['/c', 'C']]}
+    shards = {
+        'al': {'alpha': [0, 1, 1, 1, 2, 1]},
+        'be': {'beta': [0, 1, 2, 3]},
+        'ga': {'gamma': [0, 1, 1, 1, 2, 1]},
+    }
+    (search_dir / 'docs.json').write_text(json.dumps(docs))
+    for prefix, shard in shards.items():
+        (search_dir / f'{prefix}.json').write_text(json.dumps(shard))
+    return tmp_path
+
+def test_every_word_must_match(index):
+    # /b lacks the middle word: it must not come back through the last one.
+    assert search(index, 'alpha beta gamma') == ['/c', '/a']
+
+def test_stopwords_are_ignored(index):
+    assert search(index, 'the beta') == ['/c', '/a']